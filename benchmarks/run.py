@@ -0,0 +1,204 @@
+"""
+Benchmarks of :class:`~url_matcher.URLMatcher` over a synthetic workload.
+
+Usage::
+
+    python -m benchmarks.run --output results.json
+    # After some changes
+    python -m benchmarks.run --compare results.json
+
+Every measurement is the best of several repetitions. Comparing with previous
+results exits with status 1 if any measurement regressed beyond the tolerance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from random import Random
+from typing import TYPE_CHECKING, Any
+
+from benchmarks.workload import WorkloadConfig, generate
+from url_matcher import URLMatcher
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from benchmarks.workload import Workload
+
+MODES: dict[str, dict[str, Any]] = {
+    "plain": {},
+    "compiled": {"compiled": True},
+    "indexed": {"indexed": True},
+}
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    """Returns the lowest number of seconds the function took to run in the given repetitions"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def measure_memory(func: Callable[[], object]) -> int:
+    """Returns the number of bytes still allocated by the object returned by the function"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def run_mode(workload: Workload, options: dict[str, Any], repeat: int, churn: int) -> dict[str, float]:
+    """Measures a matcher with the given options. Timings per URL or rule are in microseconds."""
+    rules = list(workload.rules.items())
+    urls = workload.urls
+    results: dict[str, float] = {}
+    results["build_s"] = best_time(lambda: URLMatcher(rules, **options), repeat)
+    memory = measure_memory(lambda: URLMatcher(rules, **options))
+    results["memory_mb"] = memory / 2**20
+    results["memory_per_rule_b"] = memory / max(len(rules), 1)
+
+    matcher = URLMatcher(rules, **options)
+    # Full collections traverse all the tracked objects, including the rules
+    results["gc_ms"] = best_time(gc.collect, repeat) * 1e3
+    matcher.freeze()
+    try:
+        results["frozen_gc_ms"] = best_time(gc.collect, repeat) * 1e3
+    finally:
+        gc.unfreeze()
+    # Warm up the caches, so that the first repetition is not penalized
+    matcher.match_many(urls)
+    results["match_us"] = best_time(lambda: [matcher.match(url) for url in urls], repeat) / len(urls) * 1e6
+    results["match_all_us"] = (
+        best_time(lambda: [list(matcher.match_all(url)) for url in urls], repeat) / len(urls) * 1e6
+    )
+    results["match_many_us"] = best_time(lambda: matcher.match_many(urls), repeat) / len(urls) * 1e6
+
+    churned = Random(0).sample(rules, min(churn, len(rules)))  # noqa: S311
+
+    def churn_rules() -> None:
+        for identifier, _ in churned:
+            matcher.remove(identifier)
+        for identifier, patterns in churned:
+            matcher.add_or_update(identifier, patterns)
+
+    results["churn_us"] = best_time(churn_rules, repeat) / max(len(churned), 1) * 1e6
+    # Universal rules match every URL, so they don't count as hits
+    hits = sum(identifier is not None for identifier in matcher.match_many(urls, include_universal=False))
+    results["hit_ratio"] = hits / max(len(urls), 1)
+    return results
+
+
+def run(config: WorkloadConfig, modes: Sequence[str], repeat: int = 5, churn: int = 1000) -> dict[str, Any]:
+    """Runs the benchmarks and returns the results, ready to be stored as JSON"""
+    workload = generate(config)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "repeat": repeat,
+            "churn": churn,
+        },
+        "config": config.to_dict(),
+        "results": {mode: run_mode(workload, MODES[mode], repeat, churn) for mode in modes},
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """
+    Prints the ratio of every measurement to the baseline and returns the
+    measurements that regressed beyond the tolerance.
+    """
+    if current["config"] != baseline["config"]:
+        print("Warning: the workloads differ, the comparison may not be meaningful")
+    regressions = []
+    print(f"{'measurement':<25}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for mode, results in current["results"].items():
+        for name, value in results.items():
+            base = baseline["results"].get(mode, {}).get(name)
+            if base is None:
+                continue
+            ratio = value / base if base else 1.0
+            flag = ""
+            if name != "hit_ratio" and ratio > 1 + tolerance:
+                regressions.append(f"{mode}.{name}")
+                flag = " !"
+            print(f"{mode + '.' + name:<25}{base:>12.3f}{value:>12.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = WorkloadConfig()
+    parser.add_argument("--domains", type=int, default=defaults.domains)
+    parser.add_argument("--rules-per-domain", type=int, default=defaults.rules_per_domain)
+    parser.add_argument("--domain-skew", type=float, default=defaults.domain_skew)
+    parser.add_argument(
+        "--shapes",
+        type=json.loads,
+        default=defaults.shapes,
+        help='The weights of the pattern shapes as JSON, e.g. \'{"domain": 1, "query": 3}\'',
+    )
+    parser.add_argument("--exclude-ratio", type=float, default=defaults.exclude_ratio)
+    parser.add_argument("--universal-rules", type=int, default=defaults.universal_rules)
+    parser.add_argument("--urls", type=int, default=defaults.urls)
+    parser.add_argument("--hit-ratio", type=float, default=defaults.hit_ratio)
+    parser.add_argument("--unknown-domain-ratio", type=float, default=defaults.unknown_domain_ratio)
+    parser.add_argument("--query-ratio", type=float, default=defaults.query_ratio)
+    parser.add_argument("--fragment-ratio", type=float, default=defaults.fragment_ratio)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--churn", type=int, default=1000, help="The number of rules removed and added back")
+    parser.add_argument("--output", type=Path, help="Store the results as JSON in this file")
+    parser.add_argument("--compare", type=Path, help="Compare the results with the ones stored in this file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="The slowdown tolerated in comparisons")
+    args = parser.parse_args(argv)
+
+    config = WorkloadConfig(
+        domains=args.domains,
+        rules_per_domain=args.rules_per_domain,
+        domain_skew=args.domain_skew,
+        shapes=args.shapes,
+        exclude_ratio=args.exclude_ratio,
+        universal_rules=args.universal_rules,
+        urls=args.urls,
+        hit_ratio=args.hit_ratio,
+        unknown_domain_ratio=args.unknown_domain_ratio,
+        query_ratio=args.query_ratio,
+        fragment_ratio=args.fragment_ratio,
+        seed=args.seed,
+    )
+    results = run(config, args.modes, repeat=args.repeat, churn=args.churn)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    else:
+        print(json.dumps(results["results"], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Reproducible synthetic rules and URLs to benchmark :class:`~url_matcher.URLMatcher`.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass, field
+from itertools import accumulate
+from random import Random
+from typing import TYPE_CHECKING, Any
+
+from url_matcher import Patterns
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+SHAPES = ("domain", "subdomain", "path", "exact_path", "wildcard_path", "query", "fragment")
+
+
+@dataclass(frozen=True)
+class WorkloadConfig:
+    """
+    The parameters of a workload. The same parameters always generate the same rules and URLs.
+
+    :param domains: The number of domains with rules.
+    :param rules_per_domain: The average number of rules of a domain.
+    :param domain_skew: The exponent of the Zipf distribution of the rules and
+                        URLs among domains. 0 means uniform.
+    :param shapes: The relative weight of every shape of include pattern, see :data:`SHAPES`.
+    :param exclude_ratio: The fraction of rules with an exclude pattern.
+    :param universal_rules: The number of rules matching any domain.
+    :param urls: The number of URLs.
+    :param hit_ratio: The fraction of URLs generated to match a rule of their domain.
+    :param unknown_domain_ratio: The fraction of the URLs not generated to match a
+                                 rule that are for domains without rules.
+    :param query_ratio: The fraction of URLs with extra query parameters.
+    :param fragment_ratio: The fraction of URLs with a fragment.
+    :param seed: The seed of the random generator.
+    """
+
+    domains: int = 1000
+    rules_per_domain: int = 10
+    domain_skew: float = 1.0
+    shapes: dict[str, float] = field(
+        default_factory=lambda: {
+            "domain": 1,
+            "subdomain": 1,
+            "path": 4,
+            "exact_path": 1,
+            "wildcard_path": 2,
+            "query": 2,
+            "fragment": 0.5,
+        }
+    )
+    exclude_ratio: float = 0.3
+    universal_rules: int = 1
+    urls: int = 10_000
+    hit_ratio: float = 0.7
+    unknown_domain_ratio: float = 0.5
+    query_ratio: float = 0.3
+    fragment_ratio: float = 0.1
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        unknown = set(self.shapes) - set(SHAPES)
+        if unknown:
+            raise ValueError(f"Unknown shapes {sorted(unknown)}, the valid ones are {SHAPES}")
+
+    def to_dict(self) -> dict[str, Any]:
+        return dataclasses.asdict(self)
+
+
+@dataclass
+class Workload:
+    config: WorkloadConfig
+    rules: dict[Any, Patterns]
+    urls: list[str]
+
+
+def generate(config: WorkloadConfig) -> Workload:
+    """Generates the rules and URLs of the workload"""
+    rng = Random(config.seed)  # noqa: S311
+    domains = [f"{_word(rng)}{idx}.com" for idx in range(config.domains)]
+    weights = [1 / (rank + 1) ** config.domain_skew for rank in range(config.domains)]
+    cum_weights = list(accumulate(weights))
+    # The rules of every domain as the include pattern and the URL generated to match it
+    includes_by_domain: dict[str, list[tuple[str, str]]] = {domain: [] for domain in domains}
+    rules: dict[Any, Patterns] = {}
+    shapes = list(config.shapes)
+    shape_weights = [config.shapes[shape] for shape in shapes]
+    for idx in range(config.domains * config.rules_per_domain):
+        domain = rng.choices(domains, cum_weights=cum_weights)[0]
+        include, url = _include(rng, domain, rng.choices(shapes, shape_weights)[0])
+        exclude = [f"/{_word(rng)}/excluded"] if rng.random() < config.exclude_ratio else []
+        rules[f"rule-{idx}"] = Patterns([include], exclude, priority=rng.choice((400, 500, 500, 500, 600)))
+        includes_by_domain[domain].append((include, url))
+    for idx in range(config.universal_rules):
+        rules[f"universal-{idx}"] = Patterns([""], priority=100 + idx)
+
+    # With skew, some domains have no rules, so hits are only for the domains with rules
+    ruled_domains = [domain for domain in domains if includes_by_domain[domain]]
+    ruled_cum_weights = list(
+        accumulate(weight for domain, weight in zip(domains, weights) if includes_by_domain[domain])
+    )
+    urls = []
+    for _ in range(config.urls):
+        if rng.random() < config.hit_ratio and ruled_domains:
+            domain = rng.choices(ruled_domains, cum_weights=ruled_cum_weights)[0]
+            url = rng.choice(includes_by_domain[domain])[1]
+        elif rng.random() < config.unknown_domain_ratio:
+            url = f"https://www.{_word(rng)}-unknown.org/{_word(rng)}/{rng.randrange(10_000)}"
+        else:
+            domain = rng.choices(domains, cum_weights=cum_weights)[0]
+            url = f"https://www.{domain}/{_word(rng)}-missing/{rng.randrange(10_000)}"
+        urls.append(_decorate(rng, url, config))
+    return Workload(config, rules, urls)
+
+
+def _include(rng: Random, domain: str, shape: str) -> tuple[str, str]:
+    """Returns an include pattern of the given shape and a URL matching it"""
+    section = f"{_word(rng)}{rng.randrange(100)}"
+    item = rng.randrange(100_000)
+    if shape == "domain":
+        return domain, f"https://{domain}/{section}/{item}"
+    if shape == "subdomain":
+        return f"{section}.{domain}", f"https://{section}.{domain}/{item}"
+    if shape == "path":
+        return f"{domain}/{section}/", f"https://www.{domain}/{section}/{item}.html"
+    if shape == "exact_path":
+        return f"{domain}/{section}|", f"https://{domain}/{section}"
+    if shape == "wildcard_path":
+        return f"{domain}/{section}/*/item", f"https://{domain}/{section}/{item}/item/reviews"
+    if shape == "query":
+        param = f"{_word(rng)}Id"
+        return f"{domain}/{section}?{param}=*", f"https://{domain}/{section}?{param}={item}"
+    assert shape == "fragment"
+    return f"{domain}#{section}", f"https://{domain}/{item}#{section}"
+
+
+def _decorate(rng: Random, url: str, config: WorkloadConfig) -> str:
+    """Adds extra query parameters and a fragment to some URLs"""
+    url, _, fragment = url.partition("#")
+    if rng.random() < config.query_ratio:
+        url += f"{'&' if '?' in url else '?'}utm_source={_word(rng)}&page={rng.randrange(10)}"
+    if not fragment and rng.random() < config.fragment_ratio:
+        fragment = _word(rng)
+    return f"{url}#{fragment}" if fragment else url
+
+
+_SYLLABLES: Sequence[str] = ("ka", "lo", "mi", "ne", "pu", "ra", "si", "to", "vu", "ze", "shop", "blog", "news")
+
+
+def _word(rng: Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
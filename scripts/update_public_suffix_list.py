@@ -0,0 +1,55 @@
+"""
+Updates the snapshot of the Public Suffix List bundled with the package.
+
+Only the rules of the ICANN section are kept, without their comments. The
+private domains, e.g. ``github.io``, are dropped.
+
+Usage::
+
+    python scripts/update_public_suffix_list.py
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from urllib.request import urlopen
+
+URL = "https://publicsuffix.org/list/public_suffix_list.dat"
+PATH = Path(__file__).resolve().parent.parent / "url_matcher" / "public_suffix_list.dat"
+
+_BEGIN = "// ===BEGIN ICANN DOMAINS==="
+_END = "// ===END ICANN DOMAINS==="
+_NOTE = "// Only the rules of the ICANN section are kept."
+
+
+def icann_section(text: str) -> str:
+    """
+    Returns the header of the list followed by the rules of its ICANN section.
+    Everything from the private domains onwards is dropped.
+    """
+    lines = text.splitlines()
+    try:
+        begin = lines.index(_BEGIN)
+        end = lines.index(_END, begin)
+    except ValueError:
+        raise ValueError("The list has no ICANN section") from None
+    header = [line for line in lines[:begin] if line != _NOTE]
+    while header and not header[-1]:
+        header.pop()
+    rules = [line for line in lines[begin + 1 : end] if line and not line.startswith("//")]
+    return "\n".join([*header, "", _NOTE, "", _BEGIN, *rules, _END, ""])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=URL, help="The URL of the full list")
+    parser.add_argument("--output", type=Path, default=PATH, help="The path of the snapshot")
+    args = parser.parse_args()
+    with urlopen(args.url, timeout=60) as response:  # noqa: S310
+        text = response.read().decode("utf-8")
+    args.output.write_text(icann_section(text), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,17 +13,20 @@ setup(
     url="https://github.com/zytedata/url-matcher",
     packages=find_packages(
         exclude=[
+            "benchmarks",
             "tests",
         ]
     ),
     package_data={
-        "url_matcher": ["py.typed"],
+        "url_matcher": ["py.typed", "public_suffix_list.dat"],
     },
     include_package_data=True,
     python_requires=">=3.9",
-    install_requires=[
-        "tldextract>=1.2",
-    ],
+    extras_require={
+        "tldextract": [
+            "tldextract>=1.2",
+        ],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
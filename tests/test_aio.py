@@ -0,0 +1,102 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pytest
+
+from url_matcher import AsyncURLMatcher, Patterns, URLMatcher
+
+RULES = {
+    1: Patterns(["example.com"]),
+    2: Patterns(["example.com/products"], exclude=["?page=*"]),
+    3: Patterns([""], priority=400),
+}
+
+URLS = [
+    "http://example.com",
+    "http://example.com/products",
+    "http://example.com/products?page=2",
+    "http://other.com",
+]
+
+
+class CountingURLMatcher(URLMatcher):
+    """Records the batches of URLs it matches"""
+
+    batches: list[list[str]]
+
+    def match_many(self, urls: Any, *, include_universal: bool = True) -> list[Any]:
+        urls = list(urls)
+        self.batches.append(urls)
+        return super().match_many(urls, include_universal=include_universal)
+
+
+@pytest.mark.parametrize("with_executor", [False, True])
+def test_async_matcher(with_executor):
+    matcher = URLMatcher(RULES)
+
+    async def run() -> None:
+        with ThreadPoolExecutor(1) as executor:
+            async_matcher = AsyncURLMatcher(matcher, executor=executor if with_executor else None)
+            results = await asyncio.gather(*(async_matcher.match(url) for url in URLS))
+            assert results == [matcher.match(url) for url in URLS]
+            results = await asyncio.gather(*(async_matcher.match(url, include_universal=False) for url in URLS))
+            assert results == [matcher.match(url, include_universal=False) for url in URLS]
+            assert await async_matcher.match_many(URLS) == matcher.match_many(URLS)
+
+    asyncio.run(run())
+
+
+def test_async_matcher_batches():
+    matcher = CountingURLMatcher(RULES)
+    matcher.batches = []
+
+    async def run() -> None:
+        async_matcher = AsyncURLMatcher(matcher, max_batch_size=3, max_delay=60)
+        tasks = [asyncio.ensure_future(async_matcher.match(url)) for url in URLS]
+        await asyncio.sleep(0)
+        # The first full batch is matched right away, the rest waits for the delay
+        assert matcher.batches == [URLS[:3]]
+        await async_matcher.flush()
+        assert matcher.batches == [URLS[:3], URLS[3:]]
+        assert await asyncio.gather(*tasks) == [1, 2, 1, 3]
+
+        matcher.batches.clear()
+        async_matcher.max_delay = 0.001
+        assert list(await asyncio.gather(async_matcher.match(URLS[0]), async_matcher.match(URLS[3]))) == [1, 3]
+        assert matcher.batches == [[URLS[0], URLS[3]]]
+
+    asyncio.run(run())
+
+
+class FailingURLMatcher(CountingURLMatcher):
+    """Records the batches of URLs it matches and fails to match them"""
+
+    error = RuntimeError("boom")
+
+    def match_many(self, urls: Any, *, include_universal: bool = True) -> list[Any]:
+        self.batches.append(list(urls))
+        raise self.error
+
+
+@pytest.mark.parametrize("with_executor", [False, True])
+def test_async_matcher_error(with_executor):
+    matcher = FailingURLMatcher(RULES)
+    matcher.batches = []
+
+    async def run() -> None:
+        with ThreadPoolExecutor(1) as executor:
+            async_matcher = AsyncURLMatcher(matcher, executor=executor if with_executor else None)
+            results = await asyncio.gather(*(async_matcher.match(url) for url in URLS), return_exceptions=True)
+            # The error of the batch is raised to every call waiting for it
+            assert matcher.batches == [URLS]
+            assert all(result is FailingURLMatcher.error for result in results)
+            with pytest.raises(RuntimeError, match="boom"):
+                await async_matcher.match_many(URLS)
+
+    asyncio.run(run())
+
+
+def test_async_matcher_invalid_batch_size():
+    with pytest.raises(ValueError, match="max_batch_size"):
+        AsyncURLMatcher(URLMatcher(RULES), max_batch_size=0)
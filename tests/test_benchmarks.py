@@ -0,0 +1,28 @@
+import json
+
+from benchmarks.run import main
+from benchmarks.workload import WorkloadConfig, generate
+from url_matcher import URLMatcher
+
+
+def test_workload():
+    config = WorkloadConfig(domains=20, rules_per_domain=5, urls=300, hit_ratio=1, query_ratio=0, fragment_ratio=0)
+    workload = generate(config)
+    assert len(workload.rules) == 101
+    assert len(workload.urls) == 300
+    # The workload is reproducible
+    assert generate(config) == workload
+    assert generate(WorkloadConfig(domains=20, rules_per_domain=5, urls=300, seed=1)) != workload
+    # URLs are generated to match the rules of their domains
+    matcher = URLMatcher(workload.rules)
+    assert all(matcher.match_many(workload.urls, include_universal=False))
+
+
+def test_run(tmp_path, capsys):
+    args = ["--domains", "5", "--urls", "50", "--repeat", "1", "--churn", "5", "--modes", "plain", "indexed"]
+    assert main([*args, "--output", str(tmp_path / "results.json")]) == 0
+    results = json.loads((tmp_path / "results.json").read_text())
+    assert set(results["results"]) == {"plain", "indexed"}
+    assert results["config"]["domains"] == 5
+    assert main([*args, "--compare", str(tmp_path / "results.json"), "--tolerance", "1000"]) == 0
+    assert "plain.match_us" in capsys.readouterr().out
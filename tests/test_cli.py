@@ -0,0 +1,141 @@
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+from url_matcher.cli import load_rules, main
+
+RULES = [
+    {"id": "products", "include": ["example.com/products"], "exclude": ["?page=*"], "priority": 600},
+    {"id": "example", "include": ["example.com"]},
+    {"id": 3, "include": ["other.com"]},
+    {"id": "any", "include": [""], "priority": 400},
+]
+
+URLS = [
+    "http://example.com/products/1",
+    "http://example.com/products/2?page=2",
+    "http://other.com/a",
+    "http://unknown.com/b",
+]
+
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = tmp_path / "rules.jsonl"
+    path.write_text("".join(json.dumps(rule) + "\n" for rule in RULES), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def urls_path(tmp_path):
+    path = tmp_path / "urls.txt"
+    path.write_text("\n".join(URLS) + "\n\n", encoding="utf-8")
+    return path
+
+
+def test_load_rules(tmp_path, rules_path):
+    rules = load_rules(rules_path)
+    assert [identifier for identifier, _ in rules] == ["products", "example", 3, "any"]
+    assert rules[0][1].exclude == ("?page=*",)
+    assert rules[1][1].priority == 500
+
+    json_path = tmp_path / "rules.json"
+    json_path.write_text(json.dumps(RULES), encoding="utf-8")
+    assert load_rules(json_path) == rules
+
+    json_path.write_text(json.dumps({"id": 1}), encoding="utf-8")
+    with pytest.raises(ValueError, match="array"):
+        load_rules(json_path)
+    json_path.write_text(json.dumps([{"include": ["example.com"]}]), encoding="utf-8")
+    with pytest.raises(ValueError, match="rule 1"):
+        load_rules(json_path)
+
+
+@pytest.mark.parametrize(
+    ("record", "message"),
+    [
+        ({"include": "example.com"}, "rule 2 has an include that is not a list of strings"),
+        ({"include": ["example.com", 1]}, "rule 2 has an include that is not a list of strings"),
+        ({"include": ["x.com"], "exclude": "/a"}, "rule 2 has an exclude that is not a list of strings"),
+        ({"include": ["x.com"], "priority": "high"}, "rule 2 has a priority that is not an integer"),
+        ({"include": ["x.com"], "priority": 600.5}, "rule 2 has a priority that is not an integer"),
+        ({"include": ["x.com"], "priority": True}, "rule 2 has a priority that is not an integer"),
+        ({"id": [1], "include": ["x.com"]}, "rule 2 has an id that is not a JSON string, number, boolean or null"),
+        ({"id": {"a": 1}, "include": ["x.com"]}, "rule 2 has an id that is not a JSON string, number, boolean or null"),
+    ],
+)
+def test_load_rules_invalid_fields(tmp_path, capsys, record, message):
+    path = tmp_path / "rules.jsonl"
+    path.write_text(json.dumps(RULES[0]) + "\n" + json.dumps({"id": "invalid", **record}) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=message):
+        load_rules(path)
+    assert main([str(path)]) == 2
+    assert message in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("args", [[], ["--mode", "indexed", "--chunk-size", "1"], ["--workers", "2"]])
+def test_main(rules_path, urls_path, capsys, args):
+    assert main([str(rules_path), str(urls_path), *args]) == 0
+    out, err = capsys.readouterr()
+    assert out.splitlines() == [
+        "http://example.com/products/1\tproducts",
+        "http://example.com/products/2?page=2\texample",
+        "http://other.com/a\t3",
+        "http://unknown.com/b\tany",
+    ]
+    assert err == ""
+
+
+def test_main_options(rules_path, urls_path, capsys, monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("http://example.com/products/1\r\nhttp://unknown.com/b\n"))
+    assert main([str(rules_path), "--no-universal", "--stats", "-", str(urls_path)]) == 0
+    out, err = capsys.readouterr()
+    assert out.splitlines() == [
+        "http://example.com/products/1\tproducts",
+        "http://unknown.com/b\t",
+        "http://example.com/products/1\tproducts",
+        "http://example.com/products/2?page=2\texample",
+        "http://other.com/a\t3",
+        "http://unknown.com/b\t",
+    ]
+    assert err.startswith("urls: 6, matched: 4, ")
+    assert "urls/s" in err
+
+    assert main([str(rules_path), str(urls_path), "--all"]) == 0
+    assert capsys.readouterr().out.splitlines() == [
+        "http://example.com/products/1\tproducts\texample\tany",
+        "http://example.com/products/2?page=2\texample\tany",
+        "http://other.com/a\t3\tany",
+        "http://unknown.com/b\tany",
+    ]
+
+
+def test_main_errors(tmp_path, rules_path, urls_path, capsys):
+    assert main([str(tmp_path / "missing.json"), str(urls_path)]) == 2
+    assert "Error loading the rules" in capsys.readouterr().err
+
+    with rules_path.open("a", encoding="utf-8") as file:
+        file.write(json.dumps({"id": "invalid", "include": ["/path"]}) + "\n")
+    assert main([str(rules_path), str(urls_path)]) == 0
+    out, err = capsys.readouterr()
+    assert len(out.splitlines()) == 4
+    assert err.startswith("Skipping the rule invalid: ")
+
+    with pytest.raises(SystemExit):
+        main([str(rules_path), "--all", "--workers", "2"])
+    with pytest.raises(SystemExit):
+        main([str(rules_path), "--chunk-size", "0"])
+
+
+def test_module(rules_path):
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-m", "url_matcher", str(rules_path)],
+        input="http://other.com/a\n",
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout == "http://other.com/a\t3\n"
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from url_matcher import FrozenURLMatcher, Patterns, URLMatcher, URLMatcherBuilder
+from url_matcher.matcher import IncludePatternsWithoutDomainError
+
+RULES = {
+    1: Patterns(["example.com"]),
+    2: Patterns(["example.com/products", "other.com"], exclude=["?page=*"], priority=600),
+    3: Patterns(["bar.example.com"]),
+    4: Patterns([""]),
+    5: Patterns(["foo.com"]),
+}
+
+URLS = [
+    "http://example.com/products",
+    "http://example.com/products?page=2",
+    "http://bar.example.com/products",
+    "http://other.com",
+    "http://foo.com",
+    "http://unknown.com",
+]
+
+MATCHER_OPTIONS = [{}, {"compiled": True}, {"indexed": True}]
+
+
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_frozen_matcher(options):
+    frozen = FrozenURLMatcher(RULES, **options)
+    matcher = URLMatcher(RULES, **options)
+    for url in URLS:
+        assert list(frozen.match_all(url)) == list(matcher.match_all(url))
+    assert frozen.match_many(URLS) == matcher.match_many(URLS)
+    assert list(frozen.imatch_many(URLS, include_universal=False)) == list(
+        matcher.imatch_many(URLS, include_universal=False)
+    )
+    assert list(frozen.match_universal()) == [4]
+    assert frozen.get(2) == RULES[2]
+
+    with pytest.raises(TypeError):
+        frozen.add_or_update(6, Patterns(["example.com"]))
+    with pytest.raises(TypeError):
+        frozen.remove(1)
+    with pytest.raises(TypeError):
+        frozen.apply_changes(deletions=[1])
+    with pytest.raises(IncludePatternsWithoutDomainError):
+        FrozenURLMatcher({1: Patterns(["/no_domain_pattern"])})
+
+
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_builder(options):
+    frozen = FrozenURLMatcher(RULES, **options)
+    assert frozen.match_many(URLS) == [2, 1, 3, 2, 5, 4]
+
+    builder = frozen.builder()
+    builder.add_or_update(6, Patterns(["example.com/products"], priority=700))
+    builder.add_or_update(3, Patterns(["bar.example.com/other"]))
+    builder.remove(2)
+    builder.remove(7)
+    with pytest.raises(IncludePatternsWithoutDomainError):
+        builder.add_or_update(8, Patterns(["/no_domain_pattern"]))
+    updated = builder.build()
+    assert updated.match_many(URLS) == [6, 6, 1, 4, 5, 4]
+    assert sorted(updated.patterns) == [1, 3, 4, 5, 6]
+    assert updated.compiled == frozen.compiled
+    assert updated.indexed == frozen.indexed
+
+    # The base snapshot is not modified
+    assert frozen.match_many(URLS) == [2, 1, 3, 2, 5, 4]
+    assert sorted(frozen.patterns) == [1, 2, 3, 4, 5]
+
+    # The rules of the domains without changes are shared
+    assert updated.matchers_by_domain["foo.com"] is frozen.matchers_by_domain["foo.com"]
+    assert updated.matchers_by_domain["example.com"] is not frozen.matchers_by_domain["example.com"]
+    assert "other.com" not in updated.matchers_by_domain
+    if options:
+        assert updated._built_by_domain["foo.com"] is frozen._built_by_domain["foo.com"]
+        assert updated._built_by_domain["example.com"] is not frozen._built_by_domain["example.com"]
+
+    # Removing the universal rules
+    builder.remove(4)
+    assert builder.build().match_many(URLS) == [6, 6, 1, None, 5, None]
+
+
+def test_builder_without_base():
+    builder = URLMatcherBuilder(indexed=True)
+    for identifier, patterns in RULES.items():
+        builder.add_or_update(identifier, patterns)
+    frozen = builder.build()
+    assert frozen.indexed
+    assert frozen.match_many(URLS) == [2, 1, 3, 2, 5, 4]
+
+    # Other options for the new snapshots
+    compiled = URLMatcherBuilder(frozen, indexed=False, compiled=True).build()
+    assert compiled.compiled
+    assert not compiled.indexed
+    assert compiled.match_many(URLS) == [2, 1, 3, 2, 5, 4]
+
+
+def test_concurrent_publish():
+    matcher = FrozenURLMatcher({0: Patterns(["example.com"])}, compiled=True)
+    urls = [f"http://example.com/{idx}" for idx in range(50)]
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            snapshot = matcher
+            results = snapshot.match_many(urls)
+            # Every result is consistent with the snapshot
+            if results != [max(snapshot.patterns)] * len(urls):
+                errors.append(results)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    builder = matcher.builder()
+    for identifier in range(1, 100):
+        builder.add_or_update(identifier, Patterns(["example.com"], priority=500 + identifier))
+        matcher = builder.build()
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert not errors
+    assert matcher.match(urls[0]) == 99
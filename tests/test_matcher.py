@@ -1,7 +1,15 @@
+import gc
+from random import Random
+from typing import Any
+
 import pytest
 
 from url_matcher import Patterns, URLMatcher
+from url_matcher.compiled import CompiledDomainMatcher
+from url_matcher.index import IndexedDomainMatcher
 from url_matcher.matcher import IncludePatternsWithoutDomainError
+from url_matcher.patterns import ParsedURL, PatternMatcher
+from url_matcher.storage import TableFormatError
 
 from .util import load_json_fixture
 
@@ -9,14 +17,17 @@ PATTERNS_FIXTURE = load_json_fixture("patterns")
 CORNER_CASES_FIXTURE = load_json_fixture("patterns_corner_cases")
 RULES_FIXTURE = load_json_fixture("rules")
 
+MATCHER_OPTIONS = [{}, {"compiled": True}, {"indexed": True}]
+
 
 @pytest.mark.parametrize(
     ("patterns", "match", "no_match"),
     [(row["patterns"], row["match"], row["no_match"]) for row in PATTERNS_FIXTURE],
     ids=[row["description"] for row in PATTERNS_FIXTURE],
 )
-def test_matcher_single_rule(patterns, match, no_match):
-    matcher = URLMatcher()
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_matcher_single_rule(patterns, match, no_match, options):
+    matcher = URLMatcher(**options)
     matcher.add_or_update(23, Patterns(**patterns))
     for url in match:
         assert matcher.match(url) == 23
@@ -31,8 +42,9 @@ def test_matcher_single_rule(patterns, match, no_match):
     [(row["patterns"], row["match"], row["no_match"]) for row in CORNER_CASES_FIXTURE],
     ids=[row["description"] for row in CORNER_CASES_FIXTURE],
 )
-def test_matcher_single_rule_corner_cases(patterns, match, no_match):
-    matcher = URLMatcher()
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_matcher_single_rule_corner_cases(patterns, match, no_match, options):
+    matcher = URLMatcher(**options)
     matcher.add_or_update(23, Patterns(**patterns))
     for url in match:
         assert matcher.match(url) == 23
@@ -47,8 +59,9 @@ def test_matcher_single_rule_corner_cases(patterns, match, no_match):
     [(row["rules"], row["cases"]) for row in RULES_FIXTURE],
     ids=[row["description"] for row in RULES_FIXTURE],
 )
-def test_matcher_rules(rules, cases):
-    matcher = URLMatcher()
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_matcher_rules(rules, cases, options):
+    matcher = URLMatcher(**options)
     for id, patterns in rules:
         matcher.add_or_update(id, Patterns(**patterns))
     for url, id in cases:
@@ -149,8 +162,27 @@ def test_patterns_immutability():
         p.priority = 1  # type: ignore[misc]
 
 
-def test_match_all():
-    matcher = URLMatcher()
+def test_patterns_metadata():
+    p = Patterns(["blog.example.com/b", "", "example.com/a", "other.com", "/path"])
+    assert p.get_domains() == ["example.com", "other.com"]
+    assert p.get_includes_for("example.com") == ["blog.example.com/b", "example.com/a"]
+    assert p.get_includes_for("unknown.com") == []
+    assert p.get_includes_without_domain() == ["", "/path"]
+    assert not p.all_includes_have_domain()
+    assert not p.is_universal_pattern()
+    assert p.get_hierarchical_includes_for("example.com") == ("com.example.blog/b", "com.example/a")
+    # The returned lists can be modified without affecting the patterns
+    p.get_domains().append("modified.com")
+    p.get_includes_for("example.com").clear()
+    assert p.get_domains() == ["example.com", "other.com"]
+    assert p.get_includes_for("example.com") == ["blog.example.com/b", "example.com/a"]
+    assert p == Patterns(["blog.example.com/b", "", "example.com/a", "other.com", "/path"])
+    assert Patterns(["example.com"]).all_includes_have_domain()
+
+
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_match_all(options):
+    matcher = URLMatcher(**options)
     matcher.add_or_update(1, Patterns(include=["example.com"]))
     matcher.add_or_update(2, Patterns(include=["foo.example.com"]))
     matcher.add_or_update(3, Patterns(include=["bar.example.com/products"]))
@@ -185,3 +217,405 @@ def test_match_universal():
     matcher.add_or_update(3, Patterns(include=["foo.example.com"]))
     matcher.add_or_update(4, Patterns(include=[""]))
     assert list(matcher.match_universal()) == [4, 2]
+
+
+@pytest.mark.parametrize("options", MATCHER_OPTIONS[1:], ids=["compiled", "indexed"])
+def test_built_domain_matcher_update(options):
+    matcher = URLMatcher(**options)
+    matcher.add_or_update(1, Patterns(include=["example.com/products?id=*", "example.com/sale"], exclude=["/*.jpg|"]))
+    matcher.add_or_update(2, Patterns(include=["example.com"]))
+    assert list(matcher.match_all("http://example.com/products?id=3")) == [1, 2]
+    assert list(matcher.match_all("http://example.com/products?other=3")) == [2]
+    assert list(matcher.match_all("http://example.com/sale/pic.jpg")) == [2]
+    assert list(matcher.match_all("http://example.com/SALE/item")) == [1, 2]
+
+    # The compiled regex or the index of the domain is rebuilt after updates
+    matcher.add_or_update(3, Patterns(include=["example.com/sale"], priority=600))
+    assert list(matcher.match_all("http://example.com/sale/item")) == [3, 1, 2]
+    matcher.remove(1)
+    assert list(matcher.match_all("http://example.com/sale/item")) == [3, 2]
+
+
+def test_indexed():
+    matcher = URLMatcher(indexed=True)
+    for idx in range(100):
+        matcher.add_or_update(idx, Patterns(include=[f"example.com/section{idx}/"]))
+    matcher.add_or_update("wildcard", Patterns(include=["example.com/section1*/item|"], priority=600))
+    matcher.add_or_update("several", Patterns(include=["example.com/Other", "example.com/section50/"], priority=400))
+    matcher.add_or_update("any", Patterns(include=["example.com?id=*"], priority=300))
+    matcher.add_or_update("Päth", Patterns(include=["example.com/päth"]))
+    assert list(matcher.match_all("http://example.com/section1/item")) == ["wildcard", 1]
+    assert list(matcher.match_all("http://example.com/SECTION50/?id=2")) == [50, "several", "any"]
+    assert list(matcher.match_all("http://example.com/other")) == ["several"]
+    assert list(matcher.match_all("http://example.com/PÄTH")) == ["Päth"]
+    assert list(matcher.match_all("http://example.com/section51")) == []
+
+    domain_matcher = IndexedDomainMatcher(matcher.matchers_by_domain["example.com"])
+    candidates = domain_matcher.candidates(ParsedURL("http://example.com/section10/"))
+    # The rule with a non-ASCII path prefix is always a candidate
+    assert [m.identifier for m in candidates] == ["wildcard", 10, "Päth"]
+    # Rules requiring a query parameter are only candidates for URLs having it
+    candidates = domain_matcher.candidates(ParsedURL("http://example.com/section10/?ID=1&other=2"))
+    assert [m.identifier for m in candidates] == ["wildcard", 10, "Päth", "any"]
+    # Non-ASCII paths are matched against all the rules
+    assert len(domain_matcher.candidates(ParsedURL("http://example.com/päth"))) == 103
+    assert len(domain_matcher.candidates(ParsedURL("http://example.com/päth?id="))) == 104
+
+    with pytest.raises(ValueError, match="can't be combined"):
+        URLMatcher(compiled=True, indexed=True)
+
+
+def test_compiled():
+    rules: dict[Any, Patterns] = {
+        "domain": Patterns(["example.com"], priority=400),
+        "www": Patterns(["www.example.com/section1"]),
+        "blog": Patterns(["blog.example.com"]),
+        "https": Patterns(["https://example.com/section2|"]),
+        "port": Patterns(["example.com:8080/section1"]),
+        "wildcard": Patterns(["example.com/section*/item|", "example.com/Other#top"], priority=600),
+        "query": Patterns(["example.com/section1?id=*"]),
+        "Päth": Patterns(["example.com/päth"]),
+        "idn": Patterns(["bücher.example.com/section1"]),
+    }
+    rules.update({idx: Patterns([f"example.com/section{idx}/"]) for idx in range(100)})
+    compiled = URLMatcher(rules, compiled=True)
+    plain = URLMatcher(rules)
+    urls = [
+        "http://example.com/section1/item",
+        "http://www.example.com/section1/",
+        "http://wwwx.example.com/section1?ID=2",
+        "http://www2.example.com/section1",
+        "http://blog.example.com/section10/",
+        "http://news.blog.example.com",
+        "https://example.com/SECTION2",
+        "http://example.com/section2",
+        "http://example.com:8080/section1/item",
+        "http://example.com/other#TOP",
+        "http://example.com/other#bottom",
+        "http://example.com/PÄTH",
+        "http://bücher.example.com/section1/item",
+        "http://example.com/section50/päth",
+        "http://example.com/section51",
+    ]
+    for url in urls:
+        assert list(compiled.match_all(url)) == list(plain.match_all(url)), url
+
+    domain_matcher = compiled._domain_matcher("example.com")
+    assert isinstance(domain_matcher, CompiledDomainMatcher)
+    candidates = domain_matcher.candidates(ParsedURL("http://example.com/section10/"))
+    # Include patterns with non-ASCII netlocs are always candidates
+    assert [m.identifier for m in candidates] == ["query", 10, "idn", "domain"]
+    candidates = domain_matcher.candidates(ParsedURL("http://www.example.com/section1/?id=1"))
+    assert [m.identifier for m in candidates] == ["query", 1, "www", "idn", "domain"]
+    # Non-ASCII netlocs are matched against all the rules
+    assert len(domain_matcher.candidates(ParsedURL("http://bücher.example.com/"))) == len(rules)
+
+
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_match_many(options):
+    matcher = URLMatcher(**options)
+    matcher.add_or_update(1, Patterns(include=["example.com"]))
+    matcher.add_or_update(2, Patterns(include=["example.com/products"], exclude=["/products/old"]))
+    matcher.add_or_update(3, Patterns(include=["other.com"]))
+    matcher.add_or_update(4, Patterns(include=[""]))
+    urls = [
+        "http://example.com/products/1",
+        "http://other.com",
+        "http://example.com/products/old",
+        "http://example.net",
+        "http://example.com/products/2",
+    ]
+    expected = [matcher.match(url) for url in urls]
+    assert expected == [2, 3, 1, 4, 2]
+    assert matcher.match_many(urls) == expected
+    assert matcher.match_many(iter(urls)) == expected
+    assert matcher.match_many(urls, include_universal=False) == [2, 3, 1, None, 2]
+    assert matcher.match_many([]) == []
+
+    pairs = matcher.imatch_many(iter(urls))
+    assert next(pairs) == (urls[0], 2)
+    assert list(pairs) == list(zip(urls[1:], expected[1:]))
+    assert list(matcher.imatch_many(urls, include_universal=False))[3] == (urls[3], None)
+
+
+def test_match_case_insensitive_domain():
+    matcher = URLMatcher({1: Patterns(["example.com"]), 2: Patterns(["Other.com/Path"])})
+    assert matcher.match("http://EXAMPLE.com") == 1
+    assert matcher.match("http://www.OTHER.com/path/item") == 2
+
+
+def test_domain_cache():
+    matcher = URLMatcher({1: Patterns(["example.com"])}, domain_cache_size=2)
+    assert matcher.match("http://example.com/a") == 1
+    assert matcher.match("http://example.com/b") == 1
+    assert matcher.match("http://www.example.com/c") == 1
+    assert matcher.match("http://other.com/d") is None
+    assert matcher.match("http://example.com/e") == 1
+    info = matcher.domain_cache_info()
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (1, 4, 2, 2)
+
+    matcher = URLMatcher({1: Patterns(["example.com"])}, domain_cache_size=0)
+    assert matcher.match_many(["http://example.com/a", "http://example.com/b"]) == [1, 1]
+    assert matcher.domain_cache_info().currsize == 0
+
+
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_result_cache(options):
+    matcher = URLMatcher({1: Patterns(["example.com"]), 2: Patterns([""])}, result_cache_size=3, **options)
+    assert matcher.match("http://example.com/a") == 1
+    assert matcher.match("HTTP://Example.com/A") == 1
+    assert matcher.match("http://other.com/b") == 2
+    assert matcher.match("http://other.com/b", include_universal=False) is None
+    info = matcher.result_cache_info()
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (1, 3, 3, 3)
+    assert matcher.match_many(["http://example.com/a", "http://example.com/c"]) == [1, 1]
+    assert list(matcher.imatch_many(["http://example.com/a"])) == [("http://example.com/a", 1)]
+    assert matcher.result_cache_info().currsize == 3
+
+    # Cached results are discarded when the rules of their domain change
+    matcher.add_or_update(3, Patterns(["example.com/a"], priority=600))
+    assert matcher.match("http://example.com/a") == 3
+    matcher.remove(3)
+    assert matcher.match_many(["http://example.com/a"]) == [1]
+    assert matcher.result_cache_info().misses == 6
+
+    # And when the universal rules change, unless they are not included
+    assert matcher.match("http://other.com/b") == 2
+    matcher.add_or_update(4, Patterns([""], priority=600))
+    assert matcher.match("http://other.com/b") == 4
+    assert matcher.match("http://example.com/a", include_universal=False) == 1
+    matcher.add_or_update(5, Patterns(["example.com"], priority=700))
+    assert list(matcher.imatch_many(["http://example.com/a"], include_universal=False)) == [("http://example.com/a", 5)]
+
+    # Rules of other domains don't discard the cached results
+    hits = matcher.result_cache_info().hits
+    matcher.add_or_update(6, Patterns(["foo.com"]))
+    assert matcher.match("http://example.com/a", include_universal=False) == 5
+    assert matcher.result_cache_info().hits == hits + 1
+
+    matcher = URLMatcher({1: Patterns(["example.com"])})
+    assert matcher.match("http://example.com/a") == 1
+    assert tuple(matcher.result_cache_info()) == (0, 0, 0, 0)
+
+
+def test_bulk_init_same_order_as_incremental():
+    rules = [
+        (1, Patterns(["example.com"])),
+        (2, Patterns(["example.com/products", "other.com"], priority=600)),
+        (3, Patterns(["foo.example.com"])),
+        (4, Patterns([""])),
+        (5, Patterns(["example.com/products/shoes"])),
+        (6, Patterns([], priority=700)),
+        (3, Patterns(["bar.example.com"])),
+        (7, Patterns(["other.com/products"], priority=600)),
+    ]
+    bulk = URLMatcher(rules)
+    incremental = URLMatcher()
+    for identifier, patterns in reversed(rules[:-2]):
+        incremental.add_or_update(identifier, patterns)
+    for identifier, patterns in rules[-2:]:
+        incremental.add_or_update(identifier, patterns)
+    for matcher in (bulk, incremental):
+        by_domain = {
+            domain: [m.identifier for m in matchers] for domain, matchers in matcher.matchers_by_domain.items()
+        }
+        assert by_domain == {"example.com": [2, 5, 3, 1], "other.com": [7, 2], "": [6, 4]}
+        assert [m.identifier for m in matcher.matchers_universal] == [6, 4]
+        assert list(matcher.match_all("http://bar.example.com/products")) == [3, 1, 6, 4]
+
+
+def test_add_remove_churn():
+    random = Random(7)  # noqa: S311
+    matcher = URLMatcher()
+    current: dict[int, Patterns] = {}
+    for _ in range(500):
+        identifier = random.randrange(60)
+        if random.random() < 0.3:
+            matcher.remove(identifier)
+            current.pop(identifier, None)
+            continue
+        domain = random.choice(["example.com", "other.com", "example.org"])
+        include = random.choice(["", f"{domain}", f"{domain}/a", f"{domain}/b", f"a.{domain}"])
+        patterns = Patterns([include], priority=random.choice([400, 500, 600]))
+        matcher.add_or_update(identifier, patterns)
+        current[identifier] = patterns
+    expected = URLMatcher(current)
+    assert matcher.patterns == expected.patterns
+    assert matcher.matchers_by_domain.keys() == expected.matchers_by_domain.keys()
+    for domain, matchers in expected.matchers_by_domain.items():
+        assert [m.identifier for m in matcher.matchers_by_domain[domain]] == [m.identifier for m in matchers]
+    assert [m.identifier for m in matcher.matchers_universal] == [m.identifier for m in expected.matchers_universal]
+
+
+def test_apply_changes():
+    random = Random(11)  # noqa: S311
+    matcher = URLMatcher({1: Patterns(["example.com"]), 2: Patterns([""])}, result_cache_size=None)
+    assert matcher.match("http://example.com/a") == 1
+    assert matcher.match("http://other.com/a") == 2
+    incremental = URLMatcher(matcher.patterns)
+    for _ in range(20):
+        upserts = []
+        for _ in range(random.randrange(30)):
+            domain = random.choice(["example.com", "other.com", "example.org"])
+            include = random.choice(["", f"{domain}", f"{domain}/a", f"{domain}/b", f"a.{domain}"])
+            upserts.append((random.randrange(60), Patterns([include], priority=random.choice([400, 500, 600]))))
+        deletions = random.sample(range(60), random.randrange(20))
+        assert matcher.apply_changes(upserts, deletions) == {}
+        for identifier in deletions:
+            incremental.remove(identifier)
+        for identifier, patterns in upserts:
+            incremental.add_or_update(identifier, patterns)
+
+        assert matcher.patterns == incremental.patterns
+        assert matcher.matchers_by_domain.keys() == incremental.matchers_by_domain.keys()
+        for domain, matchers in incremental.matchers_by_domain.items():
+            assert [m.identifier for m in matcher.matchers_by_domain[domain]] == [m.identifier for m in matchers]
+        assert [m.identifier for m in matcher.matchers_universal] == [
+            m.identifier for m in incremental.matchers_universal
+        ]
+        for url in ["http://example.com/a", "http://a.example.org/b", "http://other.com/a", "http://foo.com"]:
+            assert matcher.match(url) == incremental.match(url)
+
+    # Invalid rules are reported without aborting the batch
+    errors = matcher.apply_changes(
+        {100: Patterns(["foo.com"]), 101: Patterns(["/path"]), 102: Patterns(["foo.com", "/other"])}
+    )
+    assert list(errors) == [101, 102]
+    error = errors[102]
+    assert isinstance(error, IncludePatternsWithoutDomainError)
+    assert error.wrong_patterns == ["/other"]
+    assert isinstance(errors[101], IncludePatternsWithoutDomainError)
+    assert matcher.match("http://foo.com", include_universal=False) == 100
+    assert 101 not in matcher.patterns
+
+    # Priorities that can't be sorted are reported before applying any change
+    matcher.apply_changes({103: Patterns(["foo.com/a"])})
+    errors = matcher.apply_changes(
+        {104: Patterns(["foo.com/b"], priority="600"), 105: Patterns(["other.com"])},  # type: ignore[arg-type]
+        [103],
+    )
+    assert list(errors) == [104]
+    assert "priority" in str(errors[104])
+    assert 103 not in matcher.patterns
+    assert 104 not in matcher.patterns
+    assert [m.identifier for m in matcher.matchers_by_domain["foo.com"]] == [100]
+    assert matcher.match("http://other.com", include_universal=False) == 105
+    with pytest.raises(ValueError, match="priority"):
+        matcher.add_or_update(104, Patterns(["foo.com/b"], priority=None))  # type: ignore[arg-type]
+
+    # Rules without changes are kept
+    kept = matcher._matchers[100]
+    assert matcher.apply_changes({100: Patterns(["foo.com"])}, [100]) == {}
+    assert matcher._matchers[100] is kept
+
+    # Upserts win over deletions of the same rule
+    assert matcher.apply_changes([(100, Patterns(["bar.com"]))], [100, 103]) == {}
+    assert matcher.match("http://bar.com", include_universal=False) == 100
+    assert matcher.match("http://foo.com", include_universal=False) is None
+    matcher.apply_changes(deletions=list(matcher.patterns))
+    assert matcher.matchers_by_domain == {}
+    assert matcher.matchers_universal == []
+    assert matcher.match("http://bar.com") is None
+
+
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_excludes_evaluated_once(options, monkeypatch):
+    excludes = ["example.com/cart", "?sessionid=*"]
+    rules = {idx: Patterns(["example.com/"], [*excludes, f"/only{idx}"], priority=idx) for idx in range(10)}
+    matcher = URLMatcher(rules, **options)
+    evaluated = []
+    match_parsed = PatternMatcher.match_parsed
+
+    def counting_match_parsed(self, parsed):
+        evaluated.append(self.pattern)
+        return match_parsed(self, parsed)
+
+    monkeypatch.setattr(PatternMatcher, "match_parsed", counting_match_parsed)
+    assert list(matcher.match_all("http://example.com/cart/1")) == []
+    assert evaluated.count("example.com/cart") == 1
+    evaluated.clear()
+    assert list(matcher.match_all("http://example.com/only3?sessionid=1")) == []
+    assert evaluated.count("example.com/cart") == evaluated.count("?sessionid=*") == 1
+    evaluated.clear()
+    assert list(matcher.match_all("http://example.com/only3")) == [9, 8, 7, 6, 5, 4, 2, 1, 0]
+    assert evaluated.count("example.com/cart") == evaluated.count("?sessionid=*") == 1
+    assert evaluated.count("/only3") == 1
+
+
+@pytest.mark.parametrize("options", MATCHER_OPTIONS, ids=["plain", "compiled", "indexed"])
+def test_warmup(options):
+    rules = {
+        1: Patterns(["example.com/*/item"], ["example.com/*/item/x"]),
+        2: Patterns(["other.com/*/item"]),
+        3: Patterns(["foo.org/*/item"]),
+        4: Patterns([""], ["/*/universal"]),
+    }
+    matcher = URLMatcher(rules, **options)
+    pattern_matchers = {
+        identifier: [*rule.include_matchers, *rule.exclude_matchers] for identifier, rule in matcher._matchers.items()
+    }
+    assert not any(pm.path_re or pm.query_re_dict for pms in pattern_matchers.values() for pm in pms)
+
+    matcher.warmup(["http://blog.example.com/a", "other.com"])
+    assert all(pm.path_re for pms in (pattern_matchers[1], pattern_matchers[2]) for pm in pms)
+    assert pattern_matchers[4][1].path_re is not None
+    assert pattern_matchers[3][0].path_re is None
+    if options:
+        assert set(matcher._built_by_domain) == {"example.com", "other.com"}
+    assert matcher.match("http://foo.org/a/item") == 3
+
+
+def test_freeze():
+    matcher = URLMatcher({1: Patterns(["example.com"], ["example.com/cart"])})
+    try:
+        matcher.freeze()
+        assert gc.get_freeze_count() > 0
+        assert matcher.match("http://example.com") == 1
+    finally:
+        gc.unfreeze()
+
+
+def test_dump_load(tmp_path):
+    rules = {
+        1: Patterns(["example.com"]),
+        2: Patterns(["example.com/products", "other.com"], exclude=["?page=*"], priority=600),
+        "three": Patterns(["bar.example.com"]),
+        4: Patterns([""]),
+        (5, "five"): Patterns(["пример.рф/товары"]),
+    }
+    matcher = URLMatcher(rules)
+    path = tmp_path / "rules.bin"
+    matcher.dump(path)
+    for loaded in (
+        URLMatcher.load(path),
+        URLMatcher.load(str(path), compiled=True),
+        URLMatcher.load(str(path), indexed=True),
+    ):
+        assert loaded.patterns == matcher.patterns
+        assert list(loaded.patterns) == list(matcher.patterns)
+        for domain, matchers in matcher.matchers_by_domain.items():
+            assert [m.identifier for m in loaded.matchers_by_domain[domain]] == [m.identifier for m in matchers]
+        assert [m.identifier for m in loaded.matchers_universal] == [4]
+        assert list(loaded.match_all("http://example.com/products")) == [2, 1, 4]
+        assert list(loaded.match_all("http://example.com/products?page=2")) == [1, 4]
+        assert list(loaded.match_all("http://bar.example.com/products")) == ["three", 1, 4]
+        assert loaded.match("http://пример.рф/товары/1") == (5, "five")
+
+        # Loaded matchers can still be updated
+        loaded.remove(2)
+        loaded.add_or_update(6, Patterns(["other.com"], priority=700))
+        assert list(loaded.match_all("http://other.com/products")) == [6, 4]
+
+
+def test_load_invalid(tmp_path):
+    path = tmp_path / "rules.bin"
+    path.write_bytes(b"not a table of rules, just some bytes")
+    with pytest.raises(TableFormatError):
+        URLMatcher.load(path)
+
+    URLMatcher({1: Patterns(["example.com"])}).dump(path)
+    data = bytearray(path.read_bytes())
+    data[8] = 255
+    path.write_bytes(bytes(data))
+    with pytest.raises(TableFormatError, match="version"):
+        URLMatcher.load(path)
@@ -0,0 +1,44 @@
+from collections.abc import Iterator
+
+import pytest
+
+from url_matcher import ParallelURLMatcher, Patterns, SharedURLMatcher, URLMatcher
+
+RULES = {
+    1: Patterns(["example.com"]),
+    2: Patterns(["example.com/products"], exclude=["?page=*"]),
+    3: Patterns(["other.com"]),
+    4: Patterns([""], priority=400),
+}
+
+
+def _urls(count: int) -> Iterator[str]:
+    for idx in range(count):
+        domain = ("example.com", "other.com", "unknown.com")[idx % 3]
+        yield f"http://{domain}/products/{idx}?page={idx % 2}"
+
+
+def test_parallel_matcher():
+    matcher = URLMatcher(RULES)
+    urls = list(_urls(100))
+    expected = matcher.match_many(urls)
+    with ParallelURLMatcher(matcher, workers=2, chunk_size=7, max_pending_chunks=2) as parallel_matcher:
+        assert parallel_matcher.match_many(urls) == expected
+        assert list(parallel_matcher.imatch_many(_urls(100))) == list(zip(urls, expected))
+        assert parallel_matcher.match_many(urls, include_universal=False) == matcher.match_many(
+            urls, include_universal=False
+        )
+        assert parallel_matcher.match_many([]) == []
+
+
+def test_parallel_shared_matcher(tmp_path):
+    urls = list(_urls(20))
+    shared = SharedURLMatcher.create(tmp_path / "rules.bin", RULES)
+    with ParallelURLMatcher(shared, workers=2, chunk_size=3) as parallel_matcher:
+        assert parallel_matcher.match_many(urls) == URLMatcher(RULES).match_many(urls)
+    shared.close()
+
+
+def test_parallel_matcher_invalid_chunk_size():
+    with pytest.raises(ValueError, match="chunk_size"):
+        ParallelURLMatcher(URLMatcher(RULES), chunk_size=0)
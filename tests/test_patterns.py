@@ -1,6 +1,10 @@
+import gc
+import pickle
+
 import pytest
 
-from url_matcher.patterns import PatternMatcher
+from url_matcher import Patterns, SharedURLMatcher, URLMatcher
+from url_matcher.patterns import ParsedURL, PatternMatcher, _pattern_matchers, get_pattern_matcher
 
 from .util import load_json_fixture
 
@@ -39,3 +43,145 @@ def test_pattern_matcher_warning():
         matcher = PatternMatcher("example.com/path?*_id=34")
         assert matcher.match("http://example.com/path?_id=34")
         assert not matcher.match("http://example.com/path?a_id=34")
+
+
+def test_pattern_matcher_match_parsed():
+    parsed = ParsedURL("https://www.Example.com:443/Path;p?ID=23&b=#frag")
+    assert parsed.scheme == "https"
+    assert parsed.netloc == "www.Example.com"
+    assert parsed.path == "/Path;p"
+    assert parsed.query_dict == {"id": ["23"], "b": [""]}
+    for pattern, expected in [
+        ("example.com", True),
+        ("https://example.com/path", True),
+        ("http://example.com", False),
+        ("example.com/path?id=2*", True),
+        ("example.com/path?id=24", False),
+        ("example.com#frag", True),
+        ("example.com#other", False),
+    ]:
+        matcher = PatternMatcher(pattern)
+        assert matcher.match_parsed(parsed) is expected
+        assert matcher.match(parsed.url) is expected
+
+
+def test_pattern_matcher_pickle():
+    matcher = PatternMatcher("example.com/path*|?id=2*#frag")
+    loaded = pickle.loads(pickle.dumps(matcher))  # noqa: S301
+    assert loaded.path_re is None
+    assert loaded.match("http://www.example.com/path/to?id=23#frag")
+    assert loaded.path_re is not None
+    assert loaded.path_re.pattern == matcher._regex_sources.path
+    assert not loaded.match("http://www.example.com/path/to?id=33#frag")
+    # Pickling again before matching keeps the regex sources
+    assert pickle.loads(pickle.dumps(pickle.loads(pickle.dumps(matcher)))).match("http://example.com/path?id=2#frag")  # noqa: S301
+
+
+def test_pattern_matcher_lazy_regexes():
+    matcher = PatternMatcher("example.com/path?id=*")
+    assert (matcher.netloc_re, matcher.path_re, matcher.query_re_dict) == (None, None, None)
+    assert matcher.match("http://example.com/path/to?id=2")
+    # The netloc and path are matched with literals, so only the query regex is needed
+    assert (matcher.netloc_re, matcher.path_re) == (None, None)
+    assert matcher.query_re_dict is not None
+    assert matcher.query_params() == ["id"]
+    # Components that are not ASCII are matched with regexes
+    assert matcher.match("http://example.com/path/tö?id=2")
+    assert (matcher.netloc_re, matcher.path_re) == (None, matcher.path_re)
+    assert matcher.path_re is not None
+    assert not matcher.match("http://exämple.com/path?id=2")
+    assert matcher.netloc_re is not None
+
+    matcher = PatternMatcher("example.com/*/item")
+    matcher.compile()
+    assert matcher.path_re is not None
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "example.com",
+        "Example.COM:8080",
+        "example.com/path",
+        "example.com/Path|",
+        "example.com/path/*/item",
+        "example.com#Frag",
+        "example.com#frag|",
+        "example.com?id=1",
+        "/path",
+        "exämple.com/päth",
+        "example.com/ask",
+    ],
+)
+def test_pattern_matcher_literals(pattern):
+    regex_matcher = PatternMatcher(pattern)
+    regex_matcher._netloc_literal = regex_matcher._path_literal = regex_matcher._fragment_literal = None
+    netlocs = ["example.com", "EXAMPLE.com:8080", "www.example.com", "wwwxexample.com", "www.xexample.com"]
+    netlocs += ["blog.example.com", "xexample.com", "other.com", "exämple.com", "Kexample.com"]
+    paths = ["", "/path", "/PATH", "/path/", "/path/to/item", "/päth", "/a\u017f\u212a"]
+    for netloc in netlocs:
+        for path in paths:
+            for fragment in ["", "#frag", "#FRAG", "#frag2"]:
+                url = f"http://{netloc}{path}?ID=1{fragment}"
+                assert PatternMatcher(pattern).match(url) is regex_matcher.match(url), url
+
+
+def test_get_pattern_matcher():
+    pattern = "example.com/interned/"
+    matcher = get_pattern_matcher(pattern)
+    assert matcher.pattern == pattern
+    assert get_pattern_matcher(pattern) is matcher
+    del matcher
+    gc.collect()
+    assert pattern not in _pattern_matchers
+
+    # Rules of different URL matchers share the matchers of the same patterns
+    matcher1 = URLMatcher({1: Patterns(["example.com"], ["example.com/interned/"])})
+    matcher2 = URLMatcher(
+        {
+            2: Patterns(["other.com", "example.com"], ["example.com/interned/"]),
+            3: Patterns(["foo.com"], ["example.com/interned/"]),
+        }
+    )
+    (rule1,) = matcher1.matchers_by_domain["example.com"]
+    rule2 = matcher2.matchers_by_domain["example.com"][0]
+    rule3 = matcher2.matchers_by_domain["foo.com"][0]
+    assert rule1.include_matchers[0] is rule2.include_matchers[1]
+    assert rule1.exclude_matchers[0] is rule2.exclude_matchers[0] is rule3.exclude_matchers[0]
+    del rule1, rule2, rule3
+
+    # They are discarded once the last rule using them is removed
+    matcher1.remove(1)
+    matcher2.remove(2)
+    gc.collect()
+    assert pattern in _pattern_matchers
+    matcher2.remove(3)
+    gc.collect()
+    assert pattern not in _pattern_matchers
+
+
+def test_get_pattern_matcher_loaded(tmp_path):
+    rules = {idx: Patterns([f"example{idx}.com"], ["/cart"]) for idx in range(5)}
+    matcher = URLMatcher(rules)
+    path = tmp_path / "rules.bin"
+    matcher.dump(path)
+    # Rules read from a table share the matchers in use instead of unpickled copies
+    (exclude,) = {id(rule.exclude_matchers[0]) for rule in matcher._matchers.values()}
+    for loaded in (URLMatcher.load(path), URLMatcher.load(path)):
+        assert {id(rule.exclude_matchers[0]) for rule in loaded._matchers.values()} == {exclude}
+    with SharedURLMatcher(path) as shared:
+        for idx in range(5):
+            (rule,) = shared._domain_matcher(f"example{idx}.com").matchers
+            assert id(rule.exclude_matchers[0]) == exclude
+            assert rule.include_matchers[0] is matcher._matchers[idx].include_matchers[0]
+    del matcher, loaded, shared, rule
+    gc.collect()
+    assert "/cart" not in _pattern_matchers
+
+    # Rules loaded without matchers in use share the unpickled ones
+    loaded1 = URLMatcher.load(path)
+    loaded2 = URLMatcher.load(path)
+    assert loaded1._matchers[0].exclude_matchers[0] is loaded2._matchers[4].exclude_matchers[0]
+    assert loaded1._matchers[0].exclude_matchers[0] is _pattern_matchers["/cart"]
+    assert loaded1.match("http://example0.com/cart") is None
+    assert loaded2.match("http://example4.com/products") == 4
@@ -0,0 +1,58 @@
+import pickle
+
+import pytest
+
+from url_matcher import Patterns, SharedURLMatcher, URLMatcher
+
+RULES = {
+    1: Patterns(["example.com"]),
+    2: Patterns(["example.com/products", "other.com"], exclude=["?page=*"], priority=600),
+    3: Patterns(["bar.example.com"]),
+    4: Patterns([""]),
+    5: Patterns([], priority=400),
+}
+
+URLS = [
+    "http://example.com/products",
+    "http://example.com/products?page=2",
+    "http://bar.example.com/products",
+    "http://other.com",
+    "http://unknown.com",
+]
+
+
+@pytest.mark.parametrize(("compiled", "indexed"), [(False, False), (True, False), (False, True)])
+def test_shared_matcher(tmp_path, compiled, indexed):
+    matcher = URLMatcher(RULES)
+    path = tmp_path / "rules.bin"
+    with SharedURLMatcher.create(path, matcher, compiled=compiled, indexed=indexed, rules_cache_size=1) as shared:
+        for url in URLS:
+            assert list(shared.match_all(url)) == list(matcher.match_all(url))
+            assert list(shared.match_all(url, include_universal=False)) == list(
+                matcher.match_all(url, include_universal=False)
+            )
+        assert shared.match_many(URLS) == matcher.match_many(URLS)
+        assert list(shared.imatch_many(URLS)) == list(matcher.imatch_many(URLS))
+        assert list(shared.match_universal()) == [4, 5]
+        assert shared.get(2) == RULES[2]
+        assert shared.get(6) is None
+
+        with pytest.raises(TypeError):
+            shared.add_or_update(6, Patterns(["example.com"]))
+        with pytest.raises(TypeError):
+            shared.remove(1)
+        with pytest.raises(TypeError):
+            shared.apply_changes(deletions=[1])
+
+        # Unpickled matchers read the same file
+        unpickled = pickle.loads(pickle.dumps(shared))  # noqa: S301
+        assert unpickled.path == path
+        assert unpickled.compiled is compiled
+        assert unpickled.indexed is indexed
+        assert unpickled.match_many(URLS) == matcher.match_many(URLS)
+        unpickled.close()
+
+
+def test_shared_matcher_from_data(tmp_path):
+    with SharedURLMatcher.create(tmp_path / "rules.bin", RULES.items()) as shared:
+        assert shared.match_many(URLS, include_universal=False) == [2, 1, 3, 2, None]
@@ -0,0 +1,63 @@
+import pytest
+
+from url_matcher import MatchStats, Patterns, URLMatcher
+
+RULES = {
+    1: Patterns(["example.com/products"], priority=600),
+    2: Patterns(["example.com/products/*.html"], exclude=["?page=*"]),
+    3: Patterns(["example.com"], priority=400),
+    4: Patterns([""], priority=100),
+}
+
+URLS = [
+    "http://example.com/products/a.html",
+    "http://example.com/brands",
+    "http://example.com/brands/a.html?page=2",
+    "http://other.com",
+]
+
+
+@pytest.mark.parametrize("options", [{}, {"compiled": True}, {"indexed": True}], ids=["plain", "compiled", "indexed"])
+def test_stats(options):
+    events = []
+    stats = MatchStats(callback=lambda *event: events.append(event))
+    matcher = URLMatcher(RULES, stats=stats, **options)
+    plain = URLMatcher(RULES)
+    for url in URLS:
+        assert list(matcher.match_all(url)) == list(plain.match_all(url))
+    assert matcher.match_many(URLS) == plain.match_many(URLS)
+    assert list(matcher.imatch_many(URLS, include_universal=False)) == list(
+        plain.imatch_many(URLS, include_universal=False)
+    )
+
+    snapshot = stats.snapshot()
+    assert set(snapshot["domains"]) == {"example.com", ""}
+    domain = snapshot["domains"]["example.com"]
+    assert domain["urls"] == 9
+    assert domain["hits"] == 9
+    assert snapshot["domains"][""]["urls"] == 5
+    # match_all evaluates all the rules, match_many and imatch_many stop at the first hit
+    assert snapshot["rules"][1]["hits"] == 3
+    assert snapshot["rules"][2]["hits"] == 1
+    assert snapshot["rules"][3]["hits"] == 7
+    assert snapshot["rules"][4]["hits"] == 5
+    assert domain["time"] > 0
+    assert len(events) == domain["evaluations"] + snapshot["domains"][""]["evaluations"]
+    assert events[0][:3] == ("example.com", 1, True)
+
+    stats.reset()
+    assert stats.snapshot() == {"domains": {}, "rules": {}}
+
+
+def test_stats_scanned_before_hit():
+    stats = MatchStats()
+    matcher = URLMatcher({idx: Patterns([f"example.com/{idx}"], priority=idx) for idx in range(10)}, stats=stats)
+    assert matcher.match("http://example.com/0") == 0
+    assert matcher.match("http://example.com/8") == 8
+    assert matcher.match("http://example.com/other") is None
+    domain = stats.domains["example.com"]
+    assert domain.urls == 3
+    assert domain.hits == 2
+    assert domain.evaluations == 10 + 2 + 10
+    assert domain.scanned_before_hit == 9 + 1
+    assert domain.max_scanned_before_hit == 9
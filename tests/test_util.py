@@ -0,0 +1,43 @@
+import pytest
+
+from url_matcher import util
+from url_matcher.util import get_domain, get_host, get_host_domain
+
+
+@pytest.mark.parametrize(
+    ("url", "domain"),
+    [
+        ("http://EXAMPLE.com", "example.com"),
+        ("http://user:pw@a.b.example.co.uk:80/x", "example.co.uk"),
+        ("example.com/path", "example.com"),
+        ("//example.com", "example.com"),
+        ("http://example.com./", "example.com"),
+        ("http://x。example。com", "example.com"),
+        ("http://co.uk", "co.uk"),
+        ("http://localhost:8080", "localhost"),
+        ("http://a.b.ck", "a.b.ck"),
+        ("http://www.ck", "www.ck"),
+        ("http://a.b.c.kawasaki.jp", "b.c.kawasaki.jp"),
+        ("http://city.kawasaki.jp", "city.kawasaki.jp"),
+        ("http://blog.пример.рф", "пример.рф"),
+        ("http://blog.xn--e1afmkfd.xn--p1ai", "xn--e1afmkfd.xn--p1ai"),
+        ("http://127.0.0.1:80", "127.0.0.1"),
+        ("http://1.2.3.4.5", "5"),
+        ("http://[::1]:80/", "[::1]"),
+        ("http:///path", ""),
+    ],
+)
+def test_get_domain(url, domain):
+    assert get_domain(url) == domain
+    assert get_host_domain(get_host(url)) == domain
+
+
+def test_get_domain_tldextract_fallback(monkeypatch, tmp_path):
+    pytest.importorskip("tldextract")
+    monkeypatch.setattr(util, "PUBLIC_SUFFIX_LIST_PATH", tmp_path / "missing.dat")
+    util._public_suffix_trie.cache_clear()
+    try:
+        with pytest.warns(RuntimeWarning):
+            assert get_host_domain("blog.example.co.uk") == "example.co.uk"
+    finally:
+        util._public_suffix_trie.cache_clear()
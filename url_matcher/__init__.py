@@ -1,3 +1,17 @@
-__all__ = ["Patterns", "URLMatcher"]
+__all__ = [
+    "AsyncURLMatcher",
+    "FrozenURLMatcher",
+    "MatchStats",
+    "ParallelURLMatcher",
+    "Patterns",
+    "SharedURLMatcher",
+    "URLMatcher",
+    "URLMatcherBuilder",
+]
 
+from .aio import AsyncURLMatcher
+from .frozen import FrozenURLMatcher, URLMatcherBuilder
 from .matcher import Patterns, URLMatcher
+from .parallel import ParallelURLMatcher
+from .shared import SharedURLMatcher
+from .stats import MatchStats
@@ -0,0 +1,5 @@
+import sys
+
+from url_matcher.cli import main
+
+sys.exit(main())
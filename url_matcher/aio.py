@@ -0,0 +1,131 @@
+"""
+The aio module contains the AsyncURLMatcher class.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from concurrent.futures import Executor
+
+    from url_matcher.matcher import URLMatcher
+
+
+class AsyncURLMatcher:
+    def __init__(
+        self,
+        matcher: URLMatcher,
+        *,
+        max_batch_size: int = 1000,
+        max_delay: float = 0.001,
+        executor: Executor | None = None,
+    ):
+        """
+        An asyncio front-end of a :class:`~.URLMatcher` that gathers the URLs
+        of concurrent :meth:`match` calls into micro-batches, matched at once
+        with :meth:`.URLMatcher.match_many`.
+
+        A batch is matched when it reaches ``max_batch_size`` URLs or when
+        ``max_delay`` seconds have passed since its first URL was received,
+        whatever happens first.
+
+        Example usage::
+
+            async_matcher = AsyncURLMatcher(matcher, executor=ThreadPoolExecutor(1))
+            identifier = await async_matcher.match("http://example.com")
+
+        :param matcher: The matcher with the rules.
+        :param max_batch_size: The maximum number of URLs of a batch.
+        :param max_delay: The maximum number of seconds a URL waits for its batch
+                          to be matched.
+        :param executor: The executor where batches are matched. If None, they are
+                         matched in the event loop, which is blocked meanwhile.
+        """
+        if max_batch_size < 1:
+            raise ValueError(f"max_batch_size must be positive, got {max_batch_size}")
+        self.matcher = matcher
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.executor = executor
+        # The batches being gathered, by value of include_universal
+        self._batches: dict[bool, list[tuple[str, asyncio.Future[Any | None]]]] = {}
+        self._timers: dict[bool, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Future[None]] = set()
+
+    async def match(self, url: str, *, include_universal: bool = True) -> Any | None:
+        """
+        Returns the identifier of the rule matching the URL once its batch is matched.
+        See :meth:`.URLMatcher.match`.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any | None] = loop.create_future()
+        batch = self._batches.setdefault(include_universal, [])
+        batch.append((url, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(include_universal)
+        elif len(batch) == 1:
+            self._timers[include_universal] = loop.call_later(self.max_delay, self._flush, include_universal)
+        return await future
+
+    async def match_many(self, urls: Iterable[str], *, include_universal: bool = True) -> list[Any | None]:
+        """
+        Matches a batch of URLs at once, in the executor if any.
+        See :meth:`.URLMatcher.match_many`.
+        """
+        urls = list(urls)
+        if self.executor is None:
+            return self.matcher.match_many(urls, include_universal=include_universal)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._match_many, urls, include_universal)
+
+    async def flush(self) -> None:
+        """Matches the pending batches right away and waits until they are matched."""
+        for include_universal in list(self._batches):
+            self._flush(include_universal)
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    def _flush(self, include_universal: bool) -> None:
+        timer = self._timers.pop(include_universal, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(include_universal, None)
+        if not batch:
+            return
+        if self.executor is None:
+            self._resolve(batch, include_universal)
+            return
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(self.executor, self._resolve, batch, include_universal)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _resolve(self, batch: list[tuple[str, asyncio.Future[Any | None]]], include_universal: bool) -> None:
+        """Matches the batch and sets the results of its futures, which must be done in their loop"""
+        loop = batch[0][1].get_loop()
+        set_results = loop.call_soon_threadsafe if self.executor is not None else loop.call_soon
+        try:
+            identifiers = self._match_many([url for url, _ in batch], include_universal)
+        except Exception as exception:
+            set_results(_set_exception, [future for _, future in batch], exception)
+        else:
+            set_results(_set_results, [future for _, future in batch], identifiers)
+
+    def _match_many(self, urls: list[str], include_universal: bool) -> list[Any | None]:
+        return self.matcher.match_many(urls, include_universal=include_universal)
+
+
+def _set_results(futures: list[asyncio.Future[Any | None]], identifiers: list[Any | None]) -> None:
+    for future, identifier in zip(futures, identifiers):
+        # The future is cancelled if the coroutine awaiting it was cancelled
+        if not future.done():
+            future.set_result(identifier)
+
+
+def _set_exception(futures: list[asyncio.Future[Any | None]], exception: Exception) -> None:
+    for future in futures:
+        if not future.done():
+            future.set_exception(exception)
@@ -0,0 +1,192 @@
+"""
+The command line interface, to match streams of URLs against rules stored in a file.
+
+Usage::
+
+    python -m url_matcher rules.jsonl urls.txt > matches.tsv
+    zcat crawl.log.gz | cut -f 3 | python -m url_matcher rules.json --workers 8 --stats
+
+The rules are JSON records with the ``id`` of the rule and its ``include``,
+``exclude`` and ``priority`` patterns, either in a JSON array or one per line
+in a JSONL file. The URLs are read one per line from the given files, or the
+standard input. For every URL, a line with the URL and the identifier of the
+matching rule, empty if none, separated by a tab, is written to the standard
+output, in the same order as the URLs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+
+from url_matcher.matcher import Patterns, URLMatcher
+from url_matcher.parallel import ParallelURLMatcher
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+# Big buffers make reading millions of short lines faster
+_BUFFER_SIZE = 1 << 20
+
+
+def load_rules(path: str | Path) -> list[tuple[Any, Patterns]]:
+    """
+    Returns the rules stored in a JSON or JSONL file, as ``(identifier, patterns)`` pairs.
+
+    :param path: The path of the file. It is read as JSONL if its suffix is
+                 ``.jsonl``, and as a JSON array of records otherwise.
+    """
+    path = Path(path)
+    with path.open(encoding="utf-8") as file:
+        if path.suffix == ".jsonl":
+            records = [(number, json.loads(line)) for number, line in enumerate(file, 1) if line.strip()]
+        else:
+            data = json.load(file)
+            if not isinstance(data, list):
+                raise ValueError(f"{path}: expected a JSON array of rules")
+            records = list(enumerate(data, 1))
+    rules = []
+    for number, record in records:
+        if not isinstance(record, dict) or "id" not in record:
+            raise ValueError(f"{path}: rule {number} is not a JSON object with an id")
+        # Lists and objects are not hashable, so they cannot be identifiers (bool is an int)
+        if record["id"] is not None and not isinstance(record["id"], (str, int, float)):
+            raise ValueError(f"{path}: rule {number} has an id that is not a JSON string, number, boolean or null")
+        include = record.get("include", [])
+        exclude = record.get("exclude")
+        priority = record.get("priority", 500)
+        # Patterns would split strings into one-character patterns
+        for name, value in (("include", include), ("exclude", exclude or [])):
+            if not isinstance(value, list) or not all(isinstance(pattern, str) for pattern in value):
+                raise ValueError(f"{path}: rule {number} has an {name} that is not a list of strings")
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            raise ValueError(f"{path}: rule {number} has a priority that is not an integer")
+        rules.append((record["id"], Patterns(include, exclude, priority)))
+    return rules
+
+
+def read_urls(paths: Sequence[str]) -> Iterator[str]:
+    """Yields the non-empty lines of the given files, ``-`` being the standard input, or of the standard input"""
+    for path in paths or ["-"]:
+        if path == "-":
+            yield from _read_lines(sys.stdin)
+        else:
+            with Path(path).open(encoding="utf-8", errors="replace", buffering=_BUFFER_SIZE) as file:
+                yield from _read_lines(file)
+
+
+def _read_lines(file: IO[str]) -> Iterator[str]:
+    for line in file:
+        line = line.rstrip("\r\n")  # noqa: PLW2901
+        if line:
+            yield line
+
+
+def _format(identifier: Any) -> str:
+    return "" if identifier is None else str(identifier)
+
+
+def _match_lines(matcher: URLMatcher, urls: Iterable[str], args: argparse.Namespace) -> Iterator[tuple[str, bool]]:
+    """Yields the output line for every URL and whether it matched any rule"""
+    include_universal = not args.no_universal
+    if args.all:
+        for url in urls:
+            identifiers = list(matcher.match_all(url, include_universal=include_universal))
+            yield "\t".join((url, *map(_format, identifiers))), bool(identifiers)
+        return
+    if args.workers > 1:
+        with ParallelURLMatcher(matcher, workers=args.workers, chunk_size=args.chunk_size) as parallel:
+            for url, identifier in parallel.imatch_many(urls, include_universal=include_universal):
+                yield f"{url}\t{_format(identifier)}", identifier is not None
+        return
+    # URLs are matched in chunks, so that those of the same domain are matched together
+    iterator = iter(urls)
+    while chunk := list(islice(iterator, args.chunk_size)):
+        identifiers = matcher.match_many(chunk, include_universal=include_universal)
+        for url, identifier in zip(chunk, identifiers):
+            yield f"{url}\t{_format(identifier)}", identifier is not None
+
+
+class _Stats:
+    """The throughput and the latency of every chunk of output lines"""
+
+    def __init__(self) -> None:
+        self.start = self.last = time.perf_counter()
+        self.urls = 0
+        self.matched = 0
+        self.latencies: list[float] = []
+
+    def chunk_written(self, urls: int, matched: int) -> None:
+        now = time.perf_counter()
+        self.latencies.append(now - self.last)
+        self.last = now
+        self.urls += urls
+        self.matched += matched
+
+    def report(self, file: IO[str]) -> None:
+        elapsed = time.perf_counter() - self.start
+        latencies = sorted(self.latencies) or [0.0]
+        p50, p99 = (latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1e3 for q in (0.5, 0.99))
+        print(
+            f"urls: {self.urls}, matched: {self.matched}, seconds: {elapsed:.3f}, "
+            f"urls/s: {self.urls / elapsed if elapsed else 0:.0f}, "
+            f"chunk ms: p50 {p50:.1f} p99 {p99:.1f} max {latencies[-1] * 1e3:.1f}",
+            file=file,
+        )
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m url_matcher", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("rules", help="The JSON or JSONL file with the rules")
+    parser.add_argument("urls", nargs="*", help="The files with the URLs, one per line. Defaults to the standard input")
+    parser.add_argument("--all", action="store_true", help="Write the identifiers of all the matching rules, in order")
+    parser.add_argument("--no-universal", action="store_true", help="Ignore the rules matching any domain")
+    parser.add_argument("--mode", choices=["plain", "compiled", "indexed"], default="plain", help="See URLMatcher")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="The number of worker processes, 0 meaning the number of CPUs"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=10_000, help="The number of URLs matched, and sent to workers, at once"
+    )
+    parser.add_argument("--stats", action="store_true", help="Write the throughput and latency to the standard error")
+    # Options may be given between the files
+    args = parser.parse_intermixed_args(argv)
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+    if args.all and args.workers > 1:
+        parser.error("--all can't be combined with --workers")
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as error:
+        print(f"Error loading the rules: {error}", file=sys.stderr)
+        return 2
+    matcher = URLMatcher(compiled=args.mode == "compiled", indexed=args.mode == "indexed")
+    for identifier, rule_error in matcher.apply_changes(rules).items():
+        print(f"Skipping the rule {identifier}: {rule_error}", file=sys.stderr)
+
+    stats = _Stats()
+    try:
+        lines = _match_lines(matcher, read_urls(args.urls), args)
+        # Lines are written in chunks, as writing them one by one is slow
+        while chunk := list(islice(lines, args.chunk_size)):
+            sys.stdout.write("".join(f"{line}\n" for line, _ in chunk))
+            stats.chunk_written(len(chunk), sum(matched for _, matched in chunk))
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader of the output, e.g. head, stopped reading it
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    if args.stats:
+        stats.report(sys.stderr)
+    return 0
@@ -0,0 +1,186 @@
+"""
+Matching of all the rules of a domain with a single scan of the URL.
+"""
+
+from __future__ import annotations
+
+import re
+from itertools import compress
+from operator import itemgetter
+from typing import TYPE_CHECKING, Optional
+
+from url_matcher.index import path_prefix
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from url_matcher.matcher import PatternsMatcher
+    from url_matcher.patterns import ParsedURL, PatternMatcher
+
+    # The index of a rule and its include pattern if it must still be fully
+    # checked, e.g. because of its query, or None if the rule is a candidate.
+    # typing.TypeAlias is not available on Python 3.9.
+    _Hit = tuple[int, Optional[PatternMatcher]]
+
+# The longest path prefixes put in the trie, which bounds the nesting of the regexes
+_MAX_PREFIX_LENGTH = 64
+
+
+class _TrieNode:
+    __slots__ = ("children", "leaves")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        # The regex of the rest of the path and the fragment, None if it matches anything
+        self.leaves: list[tuple[str | None, _Hit]] = []
+
+
+def _trie_re(node: _TrieNode, hits: list[_Hit]) -> str:
+    """
+    Returns the regex of the trie node, whose capturing groups match in the order
+    of the hits appended to the list. The regex always matches, but its groups
+    only capture for the leaves that the text matches.
+
+    The groups never capture an empty string, as the text always has a new line
+    after the path, so that the captured ones can be told apart by their truth.
+    """
+    parts = []
+    for rest_re, hit in node.leaves:
+        hits.append(hit)
+        parts.append(r"(?=(.|\n))" if rest_re is None else f"(?:(?=({rest_re}$))|)")
+    if node.children:
+        # The children start with different characters, so only one can match,
+        # and the scan goes on only along the path of the trie the text follows.
+        branches = []
+        for char, child in node.children.items():
+            chars = [char]
+            while not child.leaves and len(child.children) == 1:
+                ((char, child),) = child.children.items()  # noqa: PLW2901
+                chars.append(char)
+            branches.append(re.escape("".join(chars)) + _trie_re(child, hits))
+        parts.append(f"(?:{'|'.join(branches)}|)")
+    return "".join(parts)
+
+
+class _PathsMatcher:
+    __slots__ = ("hits", "regex")
+
+    def __init__(self, includes: Sequence[tuple[PatternMatcher, _Hit]]):
+        """
+        Finds which of the include patterns, all with the same scheme and netloc,
+        match the path and the fragment of a URL with a single regex, made of a
+        trie of the lowercased literal prefixes of their paths.
+        """
+        root = _TrieNode()
+        for include, hit in includes:
+            prefix = path_prefix(include)[:_MAX_PREFIX_LENGTH]
+            rest_re = include.path_and_fragment_re_str(len(prefix))
+            node = root
+            for char in prefix:
+                node = node.children.setdefault(char, _TrieNode())
+            node.leaves.append((rest_re, hit))
+        self.hits: list[_Hit] = []
+        self.regex = re.compile(_trie_re(root, self.hits), re.IGNORECASE)
+
+    def find(self, path_and_fragment: str) -> list[_Hit]:
+        match = self.regex.match(path_and_fragment)
+        # All the groups are optional so the regex always matches
+        assert match is not None
+        return list(compress(self.hits, match.groups("")))
+
+
+class CompiledDomainMatcher:
+    def __init__(self, matchers: Sequence[PatternsMatcher]):
+        """
+        Matches URLs against the sorted rules of a domain at once.
+
+        The include patterns are grouped by their scheme and netloc, which are
+        looked up by the ones of the URL instead of being matched one by one.
+        The paths and fragments of every group are merged into a single regex,
+        see :class:`_PathsMatcher`, so a single scan of the path of the URL
+        finds which include patterns match it, without going through the
+        rules for other sections of the site.
+
+        The candidate rules are then evaluated in order, checking the query of
+        their include patterns, if any, and their exclude patterns, until the
+        first matching one for :meth:`.URLMatcher.match`.
+
+        :param matchers: The rules of the domain, sorted from the most to the
+                         least prioritary.
+        """
+        self.matchers = list(matchers)
+        # The include patterns by scheme, empty if any, and lowercased netloc,
+        # with the ones also matching subdomains apart
+        includes: dict[tuple[bool, str, str], list[tuple[PatternMatcher, _Hit]]] = {}
+        # The hits for the include patterns that can't be grouped, which are
+        # always candidates, and for all the include patterns
+        self._always: list[_Hit] = []
+        self._all: list[_Hit] = []
+        for idx, matcher in enumerate(self.matchers):
+            if not matcher.include_matchers:
+                # No include patterns matches any URL
+                self._always.append((idx, None))
+                self._all.append((idx, None))
+            for include in matcher.include_matchers:
+                hit = (idx, include if include.query_params() else None)
+                self._all.append((idx, include))
+                netloc = include.parsed.netloc
+                if not netloc or not netloc.isascii():
+                    self._always.append((idx, include))
+                    continue
+                key = (include.matches_subdomains(), include.parsed.scheme, netloc.lower())
+                includes.setdefault(key, []).append((include, hit))
+        self._paths_matchers = {key: _PathsMatcher(group) for key, group in includes.items()}
+        self._schemes = {scheme for _, scheme, _ in includes}
+
+    def _hits(self, parsed: ParsedURL) -> list[_Hit]:
+        """Returns the hits of the include patterns that may match the URL, sorted by rule"""
+        netloc = parsed.lower_netloc
+        if netloc is None:
+            # Only ASCII netlocs can be looked up
+            return self._all
+        hits = list(self._always)
+        # The netloc of include patterns also matches the netloc with the "www"
+        # prefix and any character after it, see PatternMatcher._netloc_re_str
+        netlocs = [netloc, netloc[4:]] if netloc.startswith("www") and len(netloc) > 4 else [netloc]
+        subdomain_netlocs = dict.fromkeys(netlocs)
+        for position, char in enumerate(netloc):
+            if char == ".":
+                subdomain_netlocs[netloc[position + 1 :]] = None
+        path_and_fragment = None
+        for scheme in self._schemes:
+            if scheme and scheme != parsed.scheme:
+                continue
+            for subdomains, candidates in ((False, netlocs), (True, subdomain_netlocs)):
+                for candidate in candidates:
+                    paths_matcher = self._paths_matchers.get((subdomains, scheme, candidate))
+                    if paths_matcher is None:
+                        continue
+                    if path_and_fragment is None:
+                        path_and_fragment = parsed.path_and_fragment
+                    hits.extend(paths_matcher.find(path_and_fragment))
+        if len(hits) > 1:
+            hits.sort(key=itemgetter(0))
+        return hits
+
+    def candidates(self, parsed: ParsedURL) -> list[PatternsMatcher]:
+        """
+        Returns the rules with an include pattern that may match the URL, in
+        order. Neither the queries nor the exclude patterns are checked.
+        """
+        return [self.matchers[idx] for idx in dict.fromkeys(idx for idx, _ in self._hits(parsed))]
+
+    def match_all(self, parsed: ParsedURL) -> Iterator[PatternsMatcher]:
+        """
+        Yields the matching rules in order.
+        """
+        decided = -1
+        for idx, include in self._hits(parsed):
+            if idx == decided:
+                continue
+            if include is not None and not include.match_parsed(parsed):
+                continue
+            decided = idx
+            matcher = self.matchers[idx]
+            if not matcher.exclude_matchers or not matcher.excluded(parsed):
+                yield matcher
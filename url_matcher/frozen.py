@@ -0,0 +1,169 @@
+"""
+The frozen module contains the FrozenURLMatcher and URLMatcherBuilder classes.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any
+
+from url_matcher.matcher import PatternsMatcher, URLMatcher
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from url_matcher.matcher import Patterns
+
+
+class FrozenURLMatcher(URLMatcher):
+    def __init__(self, data: Mapping[Any, Patterns] | Iterable[tuple[Any, Patterns]] | None = None, **kwargs: Any):
+        """
+        An immutable snapshot of rules, with the same matching methods and
+        semantics as :class:`~.URLMatcher`.
+
+        Its rules never change, so any number of threads can match URLs with
+        it without locks. To change the rules, a :class:`~.URLMatcherBuilder`
+        creates a new snapshot from it, sharing the rules of the domains that
+        didn't change, and the new snapshot is published by replacing the
+        reference to the old one, which is atomic. Readers holding the old
+        snapshot keep matching with it until they take the new one.
+
+        Example usage::
+
+            matcher = FrozenURLMatcher({1: Patterns(["example.com"])})
+
+            # In the thread updating the rules
+            builder = matcher.builder()
+            builder.add_or_update(2, Patterns(["other.com"]))
+            builder.remove(1)
+            matcher = builder.build()
+
+        In the ``compiled`` and ``indexed`` modes, the matchers of the domains
+        are still built the first time they are matched. Concurrent readers may
+        then build the same one twice, but never see a partially built one.
+
+        :param data: A map or a list of tuples with identifier, patterns pairs to
+                     initialize the object from
+        :param kwargs: Other keyword arguments of :class:`~.URLMatcher`.
+        """
+        super().__init__(**kwargs)
+        self._kwargs = kwargs
+        if data:
+            items = data.items() if isinstance(data, Mapping) else data
+            changes: dict[Any, Patterns | None] = {}
+            for identifier, patterns in items:
+                self._validate(identifier, patterns)
+                changes[identifier] = patterns
+            self._apply(changes)
+
+    def builder(self) -> URLMatcherBuilder:
+        """Returns a builder of new snapshots, starting with the rules of this one"""
+        return URLMatcherBuilder(self)
+
+    def add_or_update(self, identifier: Any, patterns: Patterns) -> None:
+        raise TypeError(f"{type(self).__name__} is read-only, use builder() to change its rules")
+
+    def remove(self, identifier: Any) -> None:
+        raise TypeError(f"{type(self).__name__} is read-only, use builder() to change its rules")
+
+    def apply_changes(
+        self,
+        upserts: Mapping[Any, Patterns] | Iterable[tuple[Any, Patterns]] = (),
+        deletions: Iterable[Any] = (),
+    ) -> dict[Any, ValueError]:
+        raise TypeError(f"{type(self).__name__} is read-only, use builder() to change its rules")
+
+    def _apply(self, changes: Mapping[Any, Patterns | None], base: FrozenURLMatcher | None = None) -> None:
+        """
+        Sets the rules of the snapshot, being those of the base snapshot with
+        the given changes, None meaning the removal of the rule. The base
+        snapshot is not modified and the rules of the domains without changes
+        are shared with it, but its maps are copied.
+        """
+        if base is not None:
+            self._matchers = dict(base._matchers)
+            self.patterns = dict(base.patterns)
+            self.matchers_by_domain = dict(base.matchers_by_domain)
+            # Readers of the base snapshot may be adding built matchers meanwhile
+            built_by_domain = dict(base._built_by_domain)
+        removed_by_domain: dict[str, list[PatternsMatcher]] = {}
+        added_by_domain: dict[str, list[PatternsMatcher]] = {}
+        for identifier, patterns in changes.items():
+            old = self._matchers.pop(identifier, None)
+            if old is not None:
+                del self.patterns[identifier]
+                for domain in old.get_domains():
+                    removed_by_domain.setdefault(domain, []).append(old)
+            if patterns is None:
+                continue
+            self.patterns[identifier] = patterns
+            matcher = self._matchers[identifier] = PatternsMatcher(identifier, patterns)
+            for domain in matcher.get_domains():
+                added_by_domain.setdefault(domain, []).append(matcher)
+
+        changed_domains = removed_by_domain.keys() | added_by_domain.keys()
+        for domain in changed_domains:
+            removed = {id(matcher) for matcher in removed_by_domain.get(domain, ())}
+            # A new list, as the old one is still used by the base snapshot
+            matchers = [matcher for matcher in self.matchers_by_domain.get(domain, ()) if id(matcher) not in removed]
+            matchers.extend(added_by_domain.get(domain, ()))
+            if matchers:
+                # The kept rules are already sorted, which makes the sorting fast
+                matchers.sort(key=lambda matcher: matcher.sort_key(domain))
+                self.matchers_by_domain[domain] = matchers
+            else:
+                self.matchers_by_domain.pop(domain, None)
+        self.matchers_universal = self.matchers_by_domain.get("", [])
+        if base is not None:
+            self._built_by_domain = {
+                domain: built for domain, built in built_by_domain.items() if domain not in changed_domains
+            }
+
+
+class URLMatcherBuilder:
+    def __init__(self, base: FrozenURLMatcher | None = None, **kwargs: Any):
+        """
+        Collects changes of rules and builds a new :class:`~.FrozenURLMatcher`
+        with them, without modifying the base snapshot, so that it can be used
+        to match URLs meanwhile.
+
+        The new snapshot shares with the base one the rules of the domains
+        without changes, and their compiled or indexed matchers, if already
+        built, so only the changed domains are sorted and built again. The
+        maps of the rules and of the domains are still copied, which takes
+        time proportional to all the rules, e.g. about 10 ms for 100,000 rules,
+        so changes are better built in batches than one by one.
+
+        :param base: The snapshot with the initial rules. If None, there are none.
+        :param kwargs: Keyword arguments of :class:`~.FrozenURLMatcher` for the
+                       new snapshots. If there is a base snapshot, its own are
+                       used by default.
+        """
+        self.base = base
+        self._kwargs = {**base._kwargs, **kwargs} if base is not None else kwargs
+        self._changes: dict[Any, Patterns | None] = {}
+
+    def add_or_update(self, identifier: Any, patterns: Patterns) -> None:
+        """Adds or updates a rule, raising the same errors as :meth:`.URLMatcher.add_or_update` right away"""
+        URLMatcher._validate(identifier, patterns)
+        self._changes[identifier] = patterns
+
+    def remove(self, identifier: Any) -> None:
+        self._changes[identifier] = None
+
+    def build(self) -> FrozenURLMatcher:
+        """
+        Returns a new snapshot with the rules of the base snapshot and the
+        changes. The builder can be used afterwards to build further
+        snapshots with more changes.
+        """
+        snapshot = FrozenURLMatcher(**self._kwargs)
+        snapshot._apply(self._changes, self.base)
+        if self.base is not None:
+            if self._kwargs == self.base._kwargs:
+                # Hosts are mapped to the same domains, whatever the rules
+                snapshot._domain_cache = self.base._domain_cache
+            else:
+                # The built matchers of the base snapshot may be for another mode
+                snapshot._built_by_domain = {}
+        return snapshot
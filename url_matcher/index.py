@@ -0,0 +1,113 @@
+"""
+Indexing of the rules of a domain by the literal prefixes of their include paths
+and the query parameters they require.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from url_matcher.matcher import PatternsMatcher
+    from url_matcher.patterns import ParsedURL, PatternMatcher
+
+
+def path_prefix(include: PatternMatcher) -> str:
+    """
+    Returns the lowercased literal prefix that the path of the URLs matching
+    the include pattern must start with, which is empty if there is none.
+
+    >>> from url_matcher.patterns import PatternMatcher
+    >>> path_prefix(PatternMatcher("example.com/Products/*/item"))
+    '/products/'
+    >>> path_prefix(PatternMatcher("example.com/about|"))
+    '/about'
+    >>> path_prefix(PatternMatcher("example.com"))
+    ''
+    """
+    prefix = include.parsed.path.removesuffix("|").split("*", 1)[0]
+    # Regexes ignoring case fold some non-ASCII characters into ASCII ones
+    return prefix.lower() if prefix.isascii() else ""
+
+
+def required_param(include: PatternMatcher) -> str:
+    """
+    Returns a query parameter that the URLs matching the include pattern must
+    have, which is empty if there is none.
+
+    >>> from url_matcher.patterns import PatternMatcher
+    >>> required_param(PatternMatcher("example.com?productId=*&color=red"))
+    'color'
+    >>> required_param(PatternMatcher("example.com/products"))
+    ''
+    """
+    params = include.query_params()
+    return min(params) if params else ""
+
+
+class IndexedDomainMatcher:
+    def __init__(self, matchers: Sequence[PatternsMatcher]):
+        """
+        Matches URLs against the sorted rules of a domain, only evaluating the
+        rules with an include pattern that the URL path and query may match.
+
+        Every rule is indexed by the literal prefix of the path of each one of its
+        include patterns, up to the first wildcard, and by one of the query
+        parameters the include pattern requires, if any. Rules without include
+        patterns are always evaluated. The candidate rules are evaluated in the
+        same order as the rules.
+
+        :param matchers: The rules of the domain, sorted from the most to the
+                         least prioritary.
+        """
+        self.matchers = list(matchers)
+        # The positions of the rules by path prefix and required query parameter,
+        # and only by the latter for non-ASCII paths, in increasing order
+        self._positions: dict[tuple[str, str], list[int]] = {}
+        self._positions_by_param: dict[str, list[int]] = {}
+        for position, matcher in enumerate(self.matchers):
+            keys = {(path_prefix(include), required_param(include)) for include in matcher.include_matchers}
+            for key in keys or {("", "")}:
+                self._positions.setdefault(key, []).append(position)
+            for param in {param for _, param in keys or {("", "")}}:
+                self._positions_by_param.setdefault(param, []).append(position)
+        # Only the prefixes of the lengths of the existing ones need to be looked up
+        self._prefix_lengths = sorted({len(prefix) for prefix, _ in self._positions})
+        self._params = {param for _, param in self._positions if param}
+
+    def candidates(self, parsed: ParsedURL) -> list[PatternsMatcher]:
+        """Returns the rules that may match the URL, in order"""
+        params = [""]
+        if self._params and parsed.query:
+            params.extend(param for param in parsed.query_dict if param in self._params)
+        found = []
+        path = parsed.lower_path
+        if path is None:
+            for param in params:
+                positions = self._positions_by_param.get(param)
+                if positions is not None:
+                    found.append(positions)
+        else:
+            for length in self._prefix_lengths:
+                if length > len(path):
+                    break
+                prefix = path[:length]
+                for param in params:
+                    positions = self._positions.get((prefix, param))
+                    if positions is not None:
+                        found.append(positions)
+        if not found:
+            return []
+        if len(found) == 1:
+            return [self.matchers[position] for position in found[0]]
+        return [self.matchers[position] for position in sorted(set().union(*found))]
+
+    def match_all(self, parsed: ParsedURL) -> Iterator[PatternsMatcher]:
+        """
+        Yields the matching rules in order.
+        """
+        for matcher in self.candidates(parsed):
+            if matcher.match_parsed(parsed):
+                yield matcher
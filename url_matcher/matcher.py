@@ -4,13 +4,27 @@ The matcher module contains the UrlMatcher class.
 
 from __future__ import annotations
 
-from collections.abc import Iterable, Iterator, Mapping
-from dataclasses import dataclass, field
+import gc
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from dataclasses import dataclass
+from functools import cached_property
 from itertools import chain
-from typing import Any
+from numbers import Real
+from typing import TYPE_CHECKING, Any, Union
 
-from url_matcher.patterns import PatternMatcher, get_pattern_domain, hierarchical_str
-from url_matcher.util import get_domain
+from url_matcher.compiled import CompiledDomainMatcher
+from url_matcher.index import IndexedDomainMatcher
+from url_matcher.patterns import ParsedURL, PatternMatcher, get_pattern_domain, get_pattern_matcher, hierarchical_str
+from url_matcher.storage import Table, write_table
+from url_matcher.util import CacheInfo, LRUCache, get_host, get_host_domain
+
+if TYPE_CHECKING:
+    from url_matcher.stats import MatchStats
+    from url_matcher.storage import StrPath
+
+    # typing.TypeAlias is not available on Python 3.9
+    AnyDomainMatcher = Union["DomainMatcher", CompiledDomainMatcher, IndexedDomainMatcher]
 
 
 @dataclass(init=False, frozen=True)
@@ -37,44 +51,127 @@ class Patterns:
         object.__setattr__(self, "priority", priority)
 
     def get_domains(self) -> list[str]:
-        domains = [get_pattern_domain(pattern) for pattern in self.include]
         # remove duplicate domains preserving the order
-        return list(dict.fromkeys(domain for domain in domains if domain))
+        return list(dict.fromkeys(domain for domain in self._include_domains if domain))
 
     def get_includes_without_domain(self) -> list[str]:
-        return [pattern for pattern in self.include if get_pattern_domain(pattern) is None]
+        return list(self._includes_by_domain.get(None, ()))
 
     def all_includes_have_domain(self) -> bool:
         """Return true if all the include patterns have a domain"""
-        return not self.get_includes_without_domain()
+        return None not in self._includes_by_domain
 
     def is_universal_pattern(self) -> bool:
         """Return true if there are no include patterns or they are empty. A universal pattern matches any domain"""
         return not any(pattern for pattern in self.include)
 
     def get_includes_for(self, domain: str) -> list[str]:
-        return [pattern for pattern in self.include if get_pattern_domain(pattern) == domain]
+        return list(self._includes_by_domain.get(domain, ()))
+
+    def get_hierarchical_includes_for(self, domain: str) -> tuple[str, ...]:
+        """Returns the sorted :func:`~.hierarchical_str` of the include patterns of the domain"""
+        return self._hierarchical_includes_by_domain.get(domain, ())
+
+    # The properties below are computed once per instance, as it is immutable.
+    # cached_property writes into the instance __dict__, bypassing frozen=True.
+
+    @cached_property
+    def _include_domains(self) -> tuple[str | None, ...]:
+        return tuple(get_pattern_domain(pattern) for pattern in self.include)
+
+    @cached_property
+    def _includes_by_domain(self) -> dict[str | None, tuple[str, ...]]:
+        includes_by_domain: dict[str | None, list[str]] = {}
+        for pattern, domain in zip(self.include, self._include_domains):
+            includes_by_domain.setdefault(domain, []).append(pattern)
+        return {domain: tuple(patterns) for domain, patterns in includes_by_domain.items()}
+
+    @cached_property
+    def _hierarchical_includes_by_domain(self) -> dict[str | None, tuple[str, ...]]:
+        return {
+            domain: tuple(sorted(map(hierarchical_str, patterns)))
+            for domain, patterns in self._includes_by_domain.items()
+        }
+
+
+class _SortKey:
+    """
+    Wraps a sort key reversing its order, so that rules can be kept in
+    descending order with the bisect module.
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: tuple[int, tuple[str, ...], Any]):
+        self.key = key
+
+    def __lt__(self, other: _SortKey) -> bool:
+        return self.key > other.key
 
 
 @dataclass
 class PatternsMatcher:
+    # There is an instance per rule, so slots save a lot of memory. The
+    # attributes derived from the patterns are set in __post_init__ and
+    # aren't dataclass fields, as fields with defaults conflict with slots.
+    __slots__ = ("_sort_keys", "exclude_matchers", "identifier", "include_matchers", "patterns")
+
     identifier: Any
     patterns: Patterns
-    include_matchers: list[PatternMatcher] = field(init=False)
-    exclude_matchers: list[PatternMatcher] = field(init=False)
 
     def __post_init__(self) -> None:
-        self.include_matchers = [PatternMatcher(pattern) for pattern in self.patterns.include]
-        self.exclude_matchers = [PatternMatcher(pattern) for pattern in self.patterns.exclude]
+        # Rules often have the same patterns, e.g. the same excludes, so their matchers are shared
+        self.include_matchers: list[PatternMatcher] = [get_pattern_matcher(p) for p in self.patterns.include]
+        self.exclude_matchers: list[PatternMatcher] = [get_pattern_matcher(p) for p in self.patterns.exclude]
+        self._sort_keys: dict[str, _SortKey] = {}
+
+    def get_domains(self) -> list[str]:
+        """Returns the domains of the rule, being the empty domain the one of universal rules"""
+        domains = self.patterns.get_domains()
+        if self.patterns.is_universal_pattern():
+            domains.append("")
+        return domains
+
+    def sort_key(self, domain: str) -> _SortKey:
+        """
+        Returns the key to sort the rules of the domain, computed only once per domain.
+
+        Sorting criteria:
+          * Priority (descending)
+          * Sorted list of includes for this domain (descending)
+          * Rule identifier (descending)
+        """
+        key = self._sort_keys.get(domain)
+        if key is None:
+            sorted_includes = self.patterns.get_hierarchical_includes_for(domain)
+            key = self._sort_keys[domain] = _SortKey((self.patterns.priority, sorted_includes, self.identifier))
+        return key
 
     def match(self, url: str) -> bool:
+        return self.match_parsed(ParsedURL(url))
+
+    def match_parsed(self, parsed: ParsedURL) -> bool:
         if self.include_matchers:
             for include in self.include_matchers:
-                if include.match(url):
+                if include.match_parsed(parsed):
                     break
             else:
                 return False
-        return not any(exclude.match(url) for exclude in self.exclude_matchers)
+        return not self.exclude_matchers or not self.excluded(parsed)
+
+    def excluded(self, parsed: ParsedURL) -> bool:
+        """
+        Returns True if any exclude pattern matches the URL. Every distinct
+        pattern is evaluated only once per URL, whatever the rules it is in.
+        """
+        excluded_by = parsed.excluded_by
+        for exclude in self.exclude_matchers:
+            excluded = excluded_by.get(exclude.pattern)
+            if excluded is None:
+                excluded = excluded_by[exclude.pattern] = exclude.match_parsed(parsed)
+            if excluded:
+                return True
+        return False
 
 
 class IncludePatternsWithoutDomainError(ValueError):
@@ -85,8 +182,50 @@ class IncludePatternsWithoutDomainError(ValueError):
         self.wrong_patterns = wrong_patterns
 
 
+def _iter_matching(matchers: Iterable[PatternsMatcher], parsed: ParsedURL) -> Iterator[PatternsMatcher]:
+    for matcher in matchers:
+        if matcher.match_parsed(parsed):
+            yield matcher
+
+
+class DomainMatcher:
+    def __init__(self, matchers: Sequence[PatternsMatcher]):
+        """
+        Matches URLs against the sorted rules of a domain, evaluating them one by one.
+
+        :class:`~.CompiledDomainMatcher` and :class:`~.IndexedDomainMatcher` have
+        the same methods.
+        """
+        self.matchers = matchers
+
+    def candidates(self, parsed: ParsedURL) -> Sequence[PatternsMatcher]:
+        """Returns the rules that may match the URL, in order"""
+        return self.matchers
+
+    def match_all(self, parsed: ParsedURL) -> Iterator[PatternsMatcher]:
+        """Yields the matching rules in order"""
+        return _iter_matching(self.matchers, parsed)
+
+
+_NO_MATCHES = DomainMatcher(())
+
+
+def _result_cache_key(url: str, include_universal: bool) -> tuple[str, bool]:
+    # Matching ignores case, but only ASCII text is lowercased the way regexes ignore it
+    return (url.lower() if url.isascii() else url), include_universal
+
+
 class URLMatcher:
-    def __init__(self, data: Mapping[Any, Patterns] | Iterable[tuple[Any, Patterns]] | None = None):
+    def __init__(
+        self,
+        data: Mapping[Any, Patterns] | Iterable[tuple[Any, Patterns]] | None = None,
+        *,
+        compiled: bool = False,
+        domain_cache_size: int | None = 10_000,
+        indexed: bool = False,
+        stats: MatchStats | None = None,
+        result_cache_size: int | None = 0,
+    ):
         """
         A class that matches URLs against a list of patterns, returning
         the identifier of the rule that matched the URL.
@@ -102,17 +241,72 @@ class URLMatcher:
 
         :param data: A map or a list of tuples with identifier, patterns pairs to
                      initialize the object from
+        :param compiled: If True, the include patterns of the rules of a domain are
+                         grouped by scheme and netloc and their paths merged into a
+                         single regex per group, built the first time the domain is
+                         matched, so that a single scan of the URL path yields the
+                         candidate rules. It pays off for domains with many rules.
+        :param domain_cache_size: The maximum number of hosts whose domain is cached.
+                                  None means unbounded and 0 disables the cache.
+        :param indexed: If True, the rules of every domain are indexed by the literal
+                        prefixes of the paths of their include patterns and the query
+                        parameters they require the first time the domain is matched,
+                        so that only the rules whose prefixes the URL path starts with
+                        and whose parameters the URL has are evaluated. It pays off for
+                        domains with many rules for different sections or parameters.
+                        It can't be combined with ``compiled``.
+        :param stats: If given, the evaluations of the rules are recorded in it, by
+                      domain and by rule. See :class:`~.MatchStats`.
+        :param result_cache_size: The maximum number of URLs whose matching rule is
+                                  cached for :meth:`match`, :meth:`match_many` and
+                                  :meth:`imatch_many`. None means unbounded and 0,
+                                  the default, disables the cache. Cached results of
+                                  a domain are discarded when its rules change.
         """
+        if compiled and indexed:
+            raise ValueError("compiled and indexed can't be combined")
         self.matchers_by_domain: dict[str, list[PatternsMatcher]] = {}
         self.matchers_universal: list[PatternsMatcher] = []
         self.patterns: dict[Any, Patterns] = {}
+        self.compiled = compiled
+        self.indexed = indexed
+        self.stats = stats
+        # The compiled or indexed matchers of the domains, built on first use
+        self._built_by_domain: dict[str, AnyDomainMatcher] = {}
+        self._domain_cache: LRUCache[str, str] = LRUCache(domain_cache_size)
+        # The results by URL and include_universal, along with the URL domain and the
+        # versions of its rules and the universal rules they were computed with
+        self._result_cache: LRUCache[tuple[str, bool], tuple[str, int, int, Any]] | None = (
+            LRUCache(result_cache_size) if result_cache_size != 0 else None
+        )
+        # The version of the rules of every domain, increased whenever they change
+        self._domain_versions: dict[str, int] = {}
+        self._version = 0
+        # The sort keys of the rules of every domain, in the same order as the rules
+        self._sort_keys_by_domain: dict[str, list[_SortKey]] = {}
+        # The rules by identifier, so that they can be found quickly on removal
+        self._matchers: dict[Any, PatternsMatcher] = {}
 
         if data:
             items = data.items() if isinstance(data, Mapping) else data
-            for identifier, patterns in items:
-                self.add_or_update(identifier, patterns)
+            # Only the last patterns of every identifier count, as if they were added one by one
+            all_patterns = dict(items)
+            for identifier, patterns in all_patterns.items():
+                self._validate(identifier, patterns)
+            self.patterns.update(all_patterns)
+            self._add_matchers([PatternsMatcher(identifier, patterns) for identifier, patterns in all_patterns.items()])
 
     def add_or_update(self, identifier: Any, patterns: Patterns) -> None:
+        self._validate(identifier, patterns)
+        if identifier in self.patterns:
+            self.remove(identifier)
+        self.patterns[identifier] = patterns
+        matcher = self._matchers[identifier] = PatternsMatcher(identifier, patterns)
+        for domain in matcher.get_domains():
+            self._add_matcher(domain, matcher)
+
+    @staticmethod
+    def _validate(identifier: Any, patterns: Patterns) -> None:
         if not patterns.all_includes_have_domain() and not patterns.is_universal_pattern():
             wrong_patterns = [p for p in patterns.get_includes_without_domain() if p]
             raise IncludePatternsWithoutDomainError(
@@ -127,82 +321,385 @@ class URLMatcher:
                 patterns=patterns,
                 wrong_patterns=wrong_patterns,
             )
-        if identifier in self.patterns:
-            self.remove(identifier)
-        self.patterns[identifier] = patterns
-        matcher = PatternsMatcher(identifier, patterns)
-        for domain in patterns.get_domains():
-            self._add_matcher(domain, matcher)
-        if patterns.is_universal_pattern():
-            self._add_matcher("", matcher)
+        # The priorities are compared when sorting the rules, which would fail
+        # after the rule was added otherwise
+        if not isinstance(patterns.priority, Real):
+            raise ValueError(
+                f"The priority must be a number but it is {patterns.priority!r}. identifier: {identifier}."
+            )
 
     def remove(self, identifier: Any) -> None:
-        patterns = self.patterns.get(identifier)
-        if not patterns:
+        matcher = self._matchers.pop(identifier, None)
+        if matcher is None:
             return
         del self.patterns[identifier]
-        for domain in patterns.get_domains():
-            self._del_matcher(domain, identifier)
-        if patterns.is_universal_pattern():
-            self._del_matcher("", identifier)
+        for domain in matcher.get_domains():
+            self._del_matcher(domain, matcher)
+
+    def apply_changes(
+        self,
+        upserts: Mapping[Any, Patterns] | Iterable[tuple[Any, Patterns]] = (),
+        deletions: Iterable[Any] = (),
+    ) -> dict[Any, ValueError]:
+        """
+        Adds, updates and removes many rules at once, as if :meth:`remove` was
+        called for every deleted identifier and then :meth:`add_or_update` for
+        every upserted rule, but faster for big batches: the rules of every
+        affected domain are sorted only once, and upserted rules without
+        changes are skipped.
+
+        Invalid rules are skipped instead of aborting the batch.
+
+        >>> matcher = URLMatcher({1: Patterns(["example.com"])})
+        >>> errors = matcher.apply_changes({2: Patterns(["other.com"]), 3: Patterns(["/path"])}, [1])
+        >>> list(errors)
+        [3]
+        >>> sorted(matcher.patterns)
+        [2]
+
+        :param upserts: A map or a list of tuples with the identifier, patterns
+                        pairs of the rules to add or update.
+        :param deletions: The identifiers of the rules to remove. Unknown ones are ignored.
+        :return: The errors of the rules that couldn't be added or updated, by
+                 identifier, e.g. :class:`IncludePatternsWithoutDomainError`.
+                 The rules are validated before any change is applied.
+        """
+        errors: dict[Any, ValueError] = {}
+        changes: dict[Any, Patterns | None] = dict.fromkeys(deletions)
+        items = upserts.items() if isinstance(upserts, Mapping) else upserts
+        for identifier, patterns in items:
+            try:
+                self._validate(identifier, patterns)
+            except ValueError as error:
+                errors[identifier] = error
+                continue
+            if identifier in self.patterns and self.patterns[identifier] == patterns:
+                # Syncs often upsert rules without changes, which are left untouched
+                changes.pop(identifier, None)
+                continue
+            changes[identifier] = patterns
+
+        removed_by_domain: dict[str, set[int]] = {}
+        for identifier in changes:
+            old = self._matchers.pop(identifier, None)
+            if old is None:
+                continue
+            del self.patterns[identifier]
+            for domain in old.get_domains():
+                removed_by_domain.setdefault(domain, set()).add(id(old))
+        for domain, removed in removed_by_domain.items():
+            self.matchers_by_domain[domain] = [m for m in self.matchers_by_domain[domain] if id(m) not in removed]
+        upserted = {identifier: patterns for identifier, patterns in changes.items() if patterns is not None}
+        self.patterns.update(upserted)
+        self._add_matchers(
+            [PatternsMatcher(identifier, patterns) for identifier, patterns in upserted.items()], removed_by_domain
+        )
+        return errors
 
     def get(self, identifier: Any) -> Patterns | None:
         return self.patterns.get(identifier)
 
+    def dump(self, path: StrPath) -> None:
+        """
+        Stores the rules in a binary file, already parsed, compiled and sorted
+        by domain, from which :meth:`load` can restore them quickly.
+
+        The rules are pickled, so their identifiers must be picklable.
+        """
+        matchers = list(self._matchers.values())
+        idxs = {id(matcher): idx for idx, matcher in enumerate(matchers)}
+        domains = {
+            domain: [idxs[id(matcher)] for matcher in domain_matchers]
+            for domain, domain_matchers in self.matchers_by_domain.items()
+        }
+        write_table(path, matchers, domains)
+
+    @classmethod
+    def load(cls, path: StrPath, **kwargs: Any) -> URLMatcher:
+        """
+        Creates a matcher with the rules stored by :meth:`dump`, without parsing
+        or sorting them again. Their patterns share the matchers of the same
+        patterns already in use, see :func:`.get_pattern_matcher`. Only load
+        files from trusted sources, as the rules are unpickled.
+
+        :param path: The path of the file.
+        :param kwargs: Keyword arguments for the constructor, e.g. ``compiled``.
+        """
+        table = Table.open(path)
+        try:
+            matchers: list[PatternsMatcher] = list(table.rules())
+            matcher = cls(**kwargs)
+            matcher._matchers = {m.identifier: m for m in matchers}
+            matcher.patterns = {m.identifier: m.patterns for m in matchers}
+            for domain, idxs in table.domains():
+                domain_matchers = matcher.matchers_by_domain[domain] = [matchers[idx] for idx in idxs]
+                matcher._sort_keys_by_domain[domain] = [m.sort_key(domain) for m in domain_matchers]
+            matcher.matchers_universal = list(matcher.matchers_by_domain.get("", []))
+        finally:
+            table.close()
+        return matcher
+
     def match(self, url: str, *, include_universal: bool = True) -> Any | None:
+        if self._result_cache is not None:
+            return self._cached_match(url, include_universal)
         return next(self.match_all(url, include_universal=include_universal), None)
 
     def match_all(self, url: str, *, include_universal: bool = True) -> Iterator[Any]:
-        domain = get_domain(url)
-        matchers: Iterable[PatternsMatcher] = self.matchers_by_domain.get(domain) or []
-        if include_universal:
-            matchers = chain(matchers, self.matchers_universal)
+        domain = self._get_domain(url)
+        # The URL is parsed only once and shared by all the pattern matchers
+        parsed = ParsedURL(url)
+        domain_matcher = self._domain_matcher(domain)
+        matchers: Iterable[PatternsMatcher]
+        if self.stats is not None:
+            matchers = self._iter_matching_with_stats(domain, domain_matcher, parsed, include_universal)
+        else:
+            matchers = domain_matcher.match_all(parsed)
+            if include_universal:
+                matchers = chain(matchers, _iter_matching(self.matchers_universal, parsed))
         for matcher in matchers:
-            if matcher.match(url):
-                yield matcher.identifier
+            yield matcher.identifier
+
+    def match_many(self, urls: Iterable[str], *, include_universal: bool = True) -> list[Any | None]:
+        """
+        Returns the identifier of the rule matching each one of the given URLs,
+        or None for those not matching any rule, in the same order as the URLs.
+
+        It is equivalent to calling :meth:`match` for every URL, but faster for
+        big batches: URLs are grouped by domain so that the rules of every domain
+        are looked up only once per batch.
+        """
+        urls = list(urls)
+        results: list[Any | None] = [None] * len(urls)
+        idxs_by_domain: dict[str, list[int]] = {}
+        cache = self._result_cache
+        for idx, url in enumerate(urls):
+            if cache is not None:
+                cached = self._get_cached(url, include_universal)
+                if cached:
+                    results[idx] = cached[0]
+                    continue
+            idxs_by_domain.setdefault(self._get_domain(url), []).append(idx)
+        for domain, idxs in idxs_by_domain.items():
+            domain_matcher = self._domain_matcher(domain)
+            for idx in idxs:
+                results[idx] = self._first_match(domain, domain_matcher, ParsedURL(urls[idx]), include_universal)
+                if cache is not None:
+                    self._set_cached(urls[idx], include_universal, domain, results[idx])
+        return results
+
+    def imatch_many(self, urls: Iterable[str], *, include_universal: bool = True) -> Iterator[tuple[str, Any | None]]:
+        """
+        Lazy version of :meth:`match_many` yielding ``(url, identifier)`` pairs
+        as the URLs are consumed, so that the whole batch is never held in memory.
+        """
+        for url in urls:
+            if self._result_cache is not None:
+                yield url, self._cached_match(url, include_universal)
+                continue
+            domain = self._get_domain(url)
+            yield url, self._first_match(domain, self._domain_matcher(domain), ParsedURL(url), include_universal)
 
     def match_universal(self) -> Iterator[Any]:
         return (m.identifier for m in self.matchers_universal)
 
+    def domain_cache_info(self) -> CacheInfo:
+        """
+        Returns the hits, misses, maximum size and current size of the cache of
+        the domains of the URL hosts.
+        """
+        return self._domain_cache.info()
+
+    def result_cache_info(self) -> CacheInfo:
+        """
+        Returns the hits, misses, maximum size and current size of the cache of
+        results. Results discarded because the rules changed count as misses.
+        """
+        if self._result_cache is None:
+            return CacheInfo(0, 0, 0, 0)
+        return self._result_cache.info()
+
+    def freeze(self) -> None:
+        """
+        Moves the objects of the process tracked by the garbage collector,
+        including the rules of the matcher, to a permanent generation that
+        the collections ignore, with :func:`gc.freeze`. Call it once the rules
+        are loaded, so that big sets of rules don't make collections slow.
+
+        It affects the whole process and not only this matcher. The rules
+        removed afterwards are still freed, unless they are in reference
+        cycles. :func:`gc.unfreeze` moves the objects back.
+        """
+        # Garbage is collected first, otherwise it would never be
+        gc.collect()
+        gc.freeze()
+
+    def warmup(self, urls_or_domains: Iterable[str]) -> None:
+        """
+        Prepares the rules of the domains of the given URLs, hosts or domains,
+        and the universal rules, to match URLs. Otherwise, that is done the
+        first time a URL of the domain is matched, which is slower: the
+        regexes of the patterns are compiled and, in the ``compiled`` and
+        ``indexed`` modes, the matcher of the domain is built.
+
+        Call it with a sample of the expected URLs or their domains before
+        serving, so that only the domains with traffic take time and memory.
+        """
+        domains = {self._get_domain(url_or_domain) for url_or_domain in urls_or_domains}
+        matchers = chain.from_iterable(self._domain_matcher(domain).matchers for domain in domains)
+        for matcher in chain(matchers, self.matchers_universal):
+            for pattern_matcher in chain(matcher.include_matchers, matcher.exclude_matchers):
+                pattern_matcher.compile()
+
+    def _cached_match(self, url: str, include_universal: bool) -> Any | None:
+        cached = self._get_cached(url, include_universal)
+        if cached:
+            return cached[0]
+        domain = self._get_domain(url)
+        identifier = self._first_match(domain, self._domain_matcher(domain), ParsedURL(url), include_universal)
+        self._set_cached(url, include_universal, domain, identifier)
+        return identifier
+
+    def _get_cached(self, url: str, include_universal: bool) -> tuple[Any] | None:
+        """Returns the cached result as a 1-tuple, or None if it isn't cached or is outdated"""
+        cache = self._result_cache
+        assert cache is not None
+        entry = cache.get(_result_cache_key(url, include_universal))
+        if entry is None:
+            return None
+        domain, domain_version, universal_version, identifier = entry
+        versions = self._domain_versions
+        if versions.get(domain, 0) != domain_version or (
+            include_universal and versions.get("", 0) != universal_version
+        ):
+            # Outdated results count as misses
+            cache.hits -= 1
+            cache.misses += 1
+            return None
+        return (identifier,)
+
+    def _set_cached(self, url: str, include_universal: bool, domain: str, identifier: Any | None) -> None:
+        assert self._result_cache is not None
+        versions = self._domain_versions
+        entry = (domain, versions.get(domain, 0), versions.get("", 0), identifier)
+        self._result_cache[_result_cache_key(url, include_universal)] = entry
+
+    def _get_domain(self, url: str) -> str:
+        # URLs are rarely repeated but their hosts are, so the cache is keyed by host
+        host = get_host(url)
+        domain = self._domain_cache.get(host)
+        if domain is None:
+            domain = self._domain_cache[host] = get_host_domain(host)
+        return domain
+
+    def _first_match(
+        self,
+        domain: str,
+        domain_matcher: AnyDomainMatcher,
+        parsed: ParsedURL,
+        include_universal: bool,
+    ) -> Any | None:
+        if self.stats is not None:
+            matchers = self._iter_matching_with_stats(domain, domain_matcher, parsed, include_universal)
+            return next((matcher.identifier for matcher in matchers), None)
+        for matcher in domain_matcher.match_all(parsed):
+            return matcher.identifier
+        if include_universal:
+            for matcher in self.matchers_universal:
+                if matcher.match_parsed(parsed):
+                    return matcher.identifier
+        return None
+
+    def _iter_matching_with_stats(
+        self, domain: str, domain_matcher: AnyDomainMatcher, parsed: ParsedURL, include_universal: bool
+    ) -> Iterator[PatternsMatcher]:
+        assert self.stats is not None
+        yield from self.stats.iter_matching(domain, domain_matcher.candidates(parsed), parsed)
+        if include_universal:
+            yield from self.stats.iter_matching("", self.matchers_universal, parsed)
+
+    def _domain_matcher(self, domain: str) -> AnyDomainMatcher:
+        """
+        Returns the matcher of the rules of the domain.
+        """
+        matchers = self.matchers_by_domain.get(domain)
+        if not matchers:
+            return _NO_MATCHES
+        if self.compiled or self.indexed:
+            built = self._built_by_domain.get(domain)
+            if built is None:
+                built = self._built_by_domain[domain] = self._build_domain_matcher(matchers)
+            return built
+        return DomainMatcher(matchers)
+
+    def _build_domain_matcher(self, matchers: list[PatternsMatcher]) -> AnyDomainMatcher:
+        """Returns the matcher of the rules of a domain with the given rules"""
+        if self.compiled:
+            return CompiledDomainMatcher(matchers)
+        if self.indexed:
+            return IndexedDomainMatcher(matchers)
+        return DomainMatcher(matchers)
+
+    def _domain_changed(self, domain: str) -> None:
+        """Discards what was built or cached for the rules of the domain, as they changed."""
+        self._built_by_domain.pop(domain, None)
+        self._version += 1
+        self._domain_versions[domain] = self._version
+
     def _sort_domain(self, domain: str) -> None:
         """
         Sort all the rules within a domain so that the matching can be done in sequence:
         the first rule matching wins.
 
         A total ordering is defined. This is ensured by using including
-        the identifier in the sorting criteria
-
-        Sorting criteria:
-          * Priority (descending)
-          * Sorted list of includes for this domain (descending)
-          * Rule identifier (descending)
+        the identifier in the sorting criteria. See :meth:`PatternsMatcher.sort_key`.
         """
+        self._domain_changed(domain)
+        matchers = self.matchers_by_domain[domain]
+        matchers.sort(key=lambda matcher: matcher.sort_key(domain))
+        if domain == "":
+            self.matchers_universal[:] = matchers
+        if not matchers:
+            del self.matchers_by_domain[domain]
+            self._sort_keys_by_domain.pop(domain, None)
+            return
+        self._sort_keys_by_domain[domain] = [matcher.sort_key(domain) for matcher in matchers]
 
-        def sort_key(matcher: PatternsMatcher) -> tuple[int, list[str], Any]:
-            sorted_includes = sorted(map(hierarchical_str, matcher.patterns.get_includes_for(domain)))
-            return (matcher.patterns.priority, sorted_includes, matcher.identifier)
-
-        self.matchers_by_domain[domain].sort(key=sort_key, reverse=True)
-        self.matchers_universal.sort(key=sort_key, reverse=True)
-
-    def _del_matcher(self, domain: str, identifier: Any) -> None:
+    def _del_matcher(self, domain: str, matcher: PatternsMatcher) -> None:
+        """Finds the matcher by bisection on its sort key, which is unique within the domain."""
+        self._domain_changed(domain)
         matchers = self.matchers_by_domain[domain]
-        for idx in range(len(matchers)):
-            if matchers[idx].identifier == identifier:
-                del matchers[idx]
-                break
+        keys = self._sort_keys_by_domain[domain]
+        idx = bisect_left(keys, matcher.sort_key(domain))
+        assert matchers[idx] is matcher
+        del matchers[idx]
+        del keys[idx]
+        if domain == "":
+            del self.matchers_universal[idx]
         if not matchers:
             del self.matchers_by_domain[domain]
-        for idx in range(len(self.matchers_universal)):
-            if self.matchers_universal[idx].identifier == identifier:
-                del self.matchers_universal[idx]
-                break
+            del self._sort_keys_by_domain[domain]
 
     def _add_matcher(self, domain: str, matcher: PatternsMatcher) -> None:
-        # FIXME: This can be made much more efficient if we insert the data directly in order instead of resorting.
-        # The bisect module could be used for this purpose.
-        # I'm leaving it for the future as insertion time is not critical.
-        self.matchers_by_domain.setdefault(domain, []).append(matcher)
+        """Inserts the matcher in order, without resorting the domain."""
+        self._domain_changed(domain)
+        key = matcher.sort_key(domain)
+        keys = self._sort_keys_by_domain.setdefault(domain, [])
+        idx = bisect_right(keys, key)
+        keys.insert(idx, key)
+        self.matchers_by_domain.setdefault(domain, []).insert(idx, matcher)
         if domain == "":
-            self.matchers_universal.append(matcher)
-        self._sort_domain(domain)
+            self.matchers_universal.insert(idx, matcher)
+
+    def _add_matchers(self, matchers: Iterable[PatternsMatcher], changed_domains: Iterable[str] = ()) -> None:
+        """
+        Adds many matchers at once, sorting every affected domain only once,
+        along with the given domains whose rules were changed otherwise.
+        """
+        domains = set(changed_domains)
+        for matcher in matchers:
+            self._matchers[matcher.identifier] = matcher
+            for domain in matcher.get_domains():
+                self.matchers_by_domain.setdefault(domain, []).append(matcher)
+                domains.add(domain)
+        for domain in domains:
+            self._sort_domain(domain)
@@ -0,0 +1,113 @@
+"""
+The parallel module contains the ParallelURLMatcher class.
+"""
+
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from multiprocessing.context import BaseContext
+
+    from url_matcher.matcher import URLMatcher
+
+# typing.Self is not available on Python 3.9
+_ParallelURLMatcherT = TypeVar("_ParallelURLMatcherT", bound="ParallelURLMatcher")
+
+# The matcher of the current worker process
+_worker_matcher: URLMatcher | None = None
+
+
+def _init_worker(matcher: URLMatcher) -> None:
+    global _worker_matcher  # noqa: PLW0603
+    _worker_matcher = matcher
+
+
+def _match_chunk(urls: list[str], include_universal: bool) -> list[Any | None]:
+    assert _worker_matcher is not None
+    return _worker_matcher.match_many(urls, include_universal=include_universal)
+
+
+class ParallelURLMatcher:
+    def __init__(
+        self,
+        matcher: URLMatcher,
+        *,
+        workers: int | None = None,
+        chunk_size: int = 10_000,
+        max_pending_chunks: int | None = None,
+        mp_context: BaseContext | None = None,
+    ):
+        """
+        Matches big batches of URLs using a pool of worker processes, so that
+        matching is not limited to a single CPU core.
+
+        The matcher is sent only once to every worker, when the worker starts.
+        A :class:`~.SharedURLMatcher` is the cheapest to send, as workers just
+        open its file. URLs are then sent to the workers in chunks, and the
+        results are returned in the same order as the URLs.
+
+        Example usage::
+
+            with ParallelURLMatcher(matcher, workers=8) as parallel_matcher:
+                for url, identifier in parallel_matcher.imatch_many(urls):
+                    ...
+
+        :param matcher: The matcher with the rules.
+        :param workers: The number of worker processes. Defaults to the number of CPUs.
+        :param chunk_size: The number of URLs sent to a worker at once.
+        :param max_pending_chunks: The maximum number of chunks being matched or
+                                   waiting to be matched at the same time, which
+                                   bounds the memory used when the URLs come from
+                                   a lazy iterable. Defaults to twice the number
+                                   of workers.
+        :param mp_context: The multiprocessing context used to start the workers.
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        self.matcher = matcher
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=mp_context, initializer=_init_worker, initargs=(matcher,)
+        )
+        self.max_pending_chunks = max_pending_chunks or 2 * self.workers
+
+    def match_many(self, urls: Iterable[str], *, include_universal: bool = True) -> list[Any | None]:
+        """
+        Returns the identifier of the rule matching each one of the given URLs,
+        or None for those not matching any rule, in the same order as the URLs.
+        See :meth:`.URLMatcher.match_many`.
+        """
+        return [identifier for _, identifier in self.imatch_many(urls, include_universal=include_universal)]
+
+    def imatch_many(self, urls: Iterable[str], *, include_universal: bool = True) -> Iterator[tuple[str, Any | None]]:
+        """
+        Lazy version of :meth:`match_many` yielding ``(url, identifier)`` pairs.
+        Only up to ``max_pending_chunks`` chunks of URLs are read ahead.
+        """
+        pending: deque[tuple[list[str], Future[list[Any | None]]]] = deque()
+        iterator = iter(urls)
+        while chunk := list(islice(iterator, self.chunk_size)):
+            pending.append((chunk, self._executor.submit(_match_chunk, chunk, include_universal)))
+            if len(pending) >= self.max_pending_chunks:
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from zip(chunk, future.result())
+
+    def close(self) -> None:
+        """Stops the worker processes"""
+        self._executor.shutdown()
+
+    def __enter__(self: _ParallelURLMatcherT) -> _ParallelURLMatcherT:  # noqa: PYI019
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
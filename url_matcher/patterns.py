@@ -9,8 +9,9 @@ import re
 import warnings
 from functools import lru_cache
 from re import Pattern
-from typing import NamedTuple
+from typing import Any, NamedTuple
 from urllib.parse import parse_qs, urlparse
+from weakref import WeakValueDictionary
 
 from url_matcher.util import get_domain
 
@@ -76,7 +77,7 @@ class ParseTuple(NamedTuple):
     fragment: str
 
 
-@lru_cache(30)
+@lru_cache(4096)
 def pattern_parse(pattern: str) -> ParseTuple:
     """
     Parses the pattern to a named tuple (scheme, netloc, path, query, fragment)
@@ -106,6 +107,50 @@ def _urlparse(url: str) -> ParseTuple:
     return ParseTuple(scheme, netloc, path, query, fragment)
 
 
+class ParsedURL:
+    """
+    A URL parsed once so that it can be matched against many patterns.
+
+    The query is only split into parameters the first time it is needed.
+
+    >>> parsed = ParsedURL("HTTP://example.com:80/path;params?Query=23&other=24#fragment")
+    >>> parsed.scheme, parsed.netloc, parsed.path, parsed.fragment
+    ('http', 'example.com', '/path;params', 'fragment')
+    >>> parsed.query_dict
+    {'query': ['23'], 'other': ['24']}
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.scheme, self.netloc, self.path, self.query, self.fragment = _urlparse(url)
+        self._query_dict: dict[str, list[str]] | None = None
+        # The netloc, path and fragment lowercased, or None for those that are not
+        # ASCII, as only ASCII text is lowercased the way regexes ignore its case.
+        self.lower_netloc = _ascii_lower(self.netloc)
+        self.lower_path = _ascii_lower(self.path)
+        self.lower_fragment = _ascii_lower(self.fragment)
+        # Whether the URL matches the exclude patterns evaluated so far, by
+        # pattern, as many rules of a domain often have the same excludes
+        self.excluded_by: dict[str, bool] = {}
+
+    @property
+    def path_and_fragment(self) -> str:
+        """The path and the fragment joined by a new line, which cannot be part of them"""
+        return f"{self.path}\n{self.fragment}"
+
+    @property
+    def query_dict(self) -> dict[str, list[str]]:
+        """The query parameters, with lowercased names, mapped to their values"""
+        if self._query_dict is None:
+            kvs = parse_qs(self.query, keep_blank_values=True)
+            self._query_dict = {k.lower(): v for k, v in kvs.items()}
+        return self._query_dict
+
+
+def _ascii_lower(text: str) -> str | None:
+    return text.lower() if text.isascii() else None
+
+
 def _wildcard_re_escape(text: str) -> str:
     return re.escape(text).replace("\\*", ".*")
 
@@ -184,7 +229,71 @@ def split_domain_port(netloc: str) -> tuple[str, str | None]:
     return netloc, None
 
 
+# The pattern matchers in use by pattern, see get_pattern_matcher
+_pattern_matchers: WeakValueDictionary[str, PatternMatcher] = WeakValueDictionary()
+
+
+def get_pattern_matcher(pattern: str) -> PatternMatcher:
+    """
+    Returns a matcher of the pattern, shared by all the users of the same
+    pattern in the process, so that its regexes are built only once.
+    The matcher is discarded once no one uses it anymore.
+
+    >>> get_pattern_matcher("example.com/cart/") is get_pattern_matcher("example.com/cart/")
+    True
+    """
+    matcher = _pattern_matchers.get(pattern)
+    if matcher is None:
+        matcher = _pattern_matchers[pattern] = PatternMatcher(pattern)
+    return matcher
+
+
+def _unpickle_pattern_matcher(pattern: str, state: dict[str, Any]) -> PatternMatcher:
+    """
+    Returns the matcher of the pattern in use in the process, if any, or the
+    unpickled one otherwise, which is then shared like the ones returned by
+    :func:`get_pattern_matcher`, e.g. by the rules loaded from a table.
+    """
+    matcher = _pattern_matchers.get(pattern)
+    if matcher is None:
+        # The pattern isn't parsed again
+        matcher = PatternMatcher.__new__(PatternMatcher)
+        for name, value in state.items():
+            setattr(matcher, name, value)
+        matcher = _pattern_matchers.setdefault(pattern, matcher)
+    return matcher
+
+
+class _RegexSources(NamedTuple):
+    netloc: str | None
+    path: str | None
+    fragment: str | None
+    query: dict[str, str] | None
+
+
 class PatternMatcher:
+    # Slots save memory, as there is an instance per distinct pattern of the
+    # rules. __weakref__ is needed by get_pattern_matcher.
+    __slots__ = (
+        "__weakref__",
+        "_fragment_exact",
+        "_fragment_literal",
+        "_netloc_literal",
+        "_netloc_subdomains_suffix",
+        "_netloc_www_length",
+        "_path_exact",
+        "_path_literal",
+        "_regex_compiled",
+        "_regex_sources",
+        "domain",
+        "fragment_re",
+        "netloc_re",
+        "parsed",
+        "path_re",
+        "pattern",
+        "query_re_dict",
+    )
+
     def __init__(self, pattern: str):
         # Parsing and validation
         self.pattern = pattern
@@ -194,27 +303,69 @@ class PatternMatcher:
         self.path_re: Pattern[str] | None = None
         self.fragment_re: Pattern[str] | None = None
         self.query_re_dict: dict[str, Pattern[str]] | None = None
-        self._build_regexes()
+        # The regexes are compiled on first use, see compile
+        self._regex_sources = self._build_regex_sources()
+        self._regex_compiled = False
+        # Lowercased literals matching like the regexes without running them, see _build_literals
+        self._netloc_literal: str | None = None
+        self._netloc_subdomains_suffix: str | None = None
+        self._netloc_www_length = 0
+        self._path_literal: str | None = None
+        self._path_exact = False
+        self._fragment_literal: str | None = None
+        self._fragment_exact = False
+        self._build_literals()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Compiling regexes is the slowest part of loading pickled matchers,
+        # so only their sources are pickled and they are compiled on first use.
+        state = {name: getattr(self, name) for name in self.__slots__ if name != "__weakref__"}
+        state["netloc_re"] = state["path_re"] = state["fragment_re"] = state["query_re_dict"] = None
+        state["_regex_compiled"] = False
+        return _unpickle_pattern_matcher, (self.pattern, state)
+
+    def compile(self) -> None:
+        """
+        Compiles the regexes if they are still to be compiled, which is done
+        the first time the pattern matches a URL, so that only the patterns
+        of the domains with traffic cost compiling them.
 
-    def _build_regexes(self) -> None:
+        The regexes of the components with literals, see :meth:`_build_literals`,
+        are only compiled when a non ASCII component of a URL needs them.
+        """
+        if self._regex_compiled:
+            return
+        sources = self._regex_sources
+        if sources.netloc is not None and self._netloc_literal is None:
+            self.netloc_re = re.compile(sources.netloc, re.IGNORECASE)
+        if sources.path is not None and self._path_literal is None:
+            self.path_re = re.compile(sources.path, re.IGNORECASE)
+        if sources.fragment is not None and self._fragment_literal is None:
+            self.fragment_re = re.compile(sources.fragment, re.IGNORECASE)
+        if sources.query:
+            self.query_re_dict = {param: re.compile(source, re.IGNORECASE) for param, source in sources.query.items()}
+        self._regex_compiled = True
+
+    def query_params(self) -> list[str]:
+        """Returns the lowercased names of the query parameters that the URLs must have"""
+        return list(self._regex_sources.query or ())
+
+    def _literal_fallback_re(self, component: str) -> Pattern[str]:
+        """Returns the regex of a component with a literal, compiling it the first time"""
+        regex: Pattern[str] | None = getattr(self, f"{component}_re")
+        if regex is None:
+            regex = re.compile(getattr(self._regex_sources, component), re.IGNORECASE)
+            setattr(self, f"{component}_re", regex)
+        return regex
+
+    def _build_regex_sources(self) -> _RegexSources:
         """
-        Builds the compiled regexes that can be used to match the pattern.
+        Builds the sources of the regexes that can be used to match the pattern.
         """
         pscheme, pnetloc, ppath, pquery, pfragment = self.parsed
-        if pnetloc:
-            netloc_re = re.escape(pnetloc)
-            if not any((ppath, pquery, pfragment)):
-                # Also match subdomains if there is no path, query or fragment in the pattern
-                netloc_re = rf"(?:.*\.)?{netloc_re}"
-            netloc_re = f"^(?:www.)?{netloc_re}$"
-            self.netloc_re = re.compile(netloc_re, re.IGNORECASE)
-        if ppath:
-            self.path_re = self._path_or_fragment_re(ppath)
-        if pfragment:
-            self.fragment_re = self._path_or_fragment_re(pfragment)
+        query_sources = {}
         if pquery:
             pkvs = parse_qs(pquery, keep_blank_values=True)
-            query_re_dict = {}
             for pparam, values in pkvs.items():
                 pparam = pparam.lower()  # noqa: PLW2901
                 if "*" in pparam:
@@ -226,26 +377,94 @@ class PatternMatcher:
                     pparam = pparam.replace("*", "")  # noqa: PLW2901
                 if not pparam:
                     continue
-                param_re = rf"^(?:{'|'.join([_wildcard_re_escape(value) for value in values])})$"
-                query_re_dict[pparam] = re.compile(param_re, re.IGNORECASE)
-            self.query_re_dict = query_re_dict or None
+                query_sources[pparam] = rf"^(?:{'|'.join([_wildcard_re_escape(value) for value in values])})$"
+        return _RegexSources(
+            rf"^{self._netloc_re_str()}$" if pnetloc else None,
+            self._path_or_fragment_re(ppath) if ppath else None,
+            self._path_or_fragment_re(pfragment) if pfragment else None,
+            query_sources or None,
+        )
+
+    def _build_literals(self) -> None:
+        """
+        Builds the literals that can be used to match the pattern instead of its
+        regexes when its components have no wildcards.
+
+        Only ASCII literals are used, which match the ASCII components of URLs
+        with plain string comparisons once both are lowercased.
+        """
+        _, pnetloc, ppath, pquery, pfragment = self.parsed
+        if pnetloc and pnetloc.isascii():
+            # See _netloc_re_str: the optional "www." prefix of the regex matches
+            # any character after "www", and subdomains match if there is no path,
+            # query or fragment.
+            self._netloc_literal = pnetloc.lower()
+            self._netloc_www_length = len(pnetloc) + 4
+            if not any((ppath, pquery, pfragment)):
+                self._netloc_subdomains_suffix = f".{self._netloc_literal}"
+        self._path_literal, self._path_exact = self._path_or_fragment_literal(ppath)
+        self._fragment_literal, self._fragment_exact = self._path_or_fragment_literal(pfragment)
+
+    @staticmethod
+    def _path_or_fragment_literal(path_or_fragment: str) -> tuple[str | None, bool]:
+        """Returns the lowercased literal, if there are no wildcards, and whether the match must be exact"""
+        if not path_or_fragment or "*" in path_or_fragment or not path_or_fragment.isascii():
+            return None, False
+        if path_or_fragment.endswith("|"):
+            return path_or_fragment[:-1].lower(), True
+        return path_or_fragment.lower(), False
 
     def match(self, url: str) -> bool:
         """
         Return True if the url matches the pattern.
         """
-        parsed = _urlparse(url)
+        return self.match_parsed(ParsedURL(url))
+
+    def match_parsed(self, parsed: ParsedURL) -> bool:
+        """
+        Return True if the already parsed url matches the pattern.
+        """
+        if not self._regex_compiled:
+            self.compile()
         if self.parsed.scheme and parsed.scheme != self.parsed.scheme:
             return False
-        if self.netloc_re and not self.netloc_re.match(parsed.netloc):
+        # The literals, if any, are checked inline as function calls would cost more than the regexes
+        literal = self._netloc_literal
+        if literal is not None:
+            netloc = parsed.lower_netloc
+            if netloc is None:
+                if not self._literal_fallback_re("netloc").match(parsed.netloc):
+                    return False
+            elif not (
+                netloc == literal
+                or (self._netloc_subdomains_suffix is not None and netloc.endswith(self._netloc_subdomains_suffix))
+                or (len(netloc) == self._netloc_www_length and netloc.startswith("www") and netloc.endswith(literal))
+            ):
+                return False
+        elif self.netloc_re and not self.netloc_re.match(parsed.netloc):
             return False
-        if self.path_re and not self.path_re.match(parsed.path):
+        literal = self._path_literal
+        if literal is not None:
+            path = parsed.lower_path
+            if path is None:
+                if not self._literal_fallback_re("path").match(parsed.path):
+                    return False
+            elif (path != literal) if self._path_exact else not path.startswith(literal):
+                return False
+        elif self.path_re and not self.path_re.match(parsed.path):
             return False
-        if self.fragment_re and not self.fragment_re.match(parsed.fragment):
+        literal = self._fragment_literal
+        if literal is not None:
+            fragment = parsed.lower_fragment
+            if fragment is None:
+                if not self._literal_fallback_re("fragment").match(parsed.fragment):
+                    return False
+            elif (fragment != literal) if self._fragment_exact else not fragment.startswith(literal):
+                return False
+        elif self.fragment_re and not self.fragment_re.match(parsed.fragment):
             return False
         if self.query_re_dict:
-            kvs = parse_qs(parsed.query, keep_blank_values=True)
-            kvs = {k.lower(): v for k, v in kvs.items()}
+            kvs = parsed.query_dict
             # All params must be present in the URL
             for param, param_re in self.query_re_dict.items():
                 if param not in kvs:
@@ -254,14 +473,49 @@ class PatternMatcher:
                     return False
         return True
 
-    @staticmethod
-    def _path_or_fragment_re(path_or_fragment: str) -> Pattern[str]:
+    def matches_subdomains(self) -> bool:
+        """Returns True if the subdomains of the netloc of the pattern also match it"""
+        _, pnetloc, ppath, pquery, pfragment = self.parsed
+        return bool(pnetloc) and not any((ppath, pquery, pfragment))
+
+    def path_and_fragment_re_str(self, skip: int = 0) -> str | None:
+        r"""
+        Returns a regex matching the :attr:`ParsedURL.path_and_fragment` of the
+        URLs whose path, without its first ``skip`` characters, and fragment
+        match the pattern, or None if any path and fragment match. The scheme,
+        netloc and query, if any, must still be checked apart.
+
+        >>> print(PatternMatcher("https://example.com/path|").path_and_fragment_re_str())
+        /path\n.*
+        >>> print(PatternMatcher("example.com/path/*/item|#top").path_and_fragment_re_str(6))
+        .*/item\ntop.*
+        >>> PatternMatcher("example.com/path/").path_and_fragment_re_str(6) is None
+        True
+        """
+        _, _, ppath, _, pfragment = self.parsed
+        path_re = self._path_or_fragment_re_str(ppath[skip:])
+        fragment_re = self._path_or_fragment_re_str(pfragment)
+        if path_re == fragment_re == ".*":
+            return None
+        return rf"{path_re}\n{fragment_re}"
+
+    def _netloc_re_str(self) -> str:
+        _, pnetloc, ppath, pquery, pfragment = self.parsed
+        netloc_re = re.escape(pnetloc)
+        if not any((ppath, pquery, pfragment)):
+            # Also match subdomains if there is no path, query or fragment in the pattern
+            netloc_re = rf"(?:.*\.)?{netloc_re}"
+        return f"(?:www.)?{netloc_re}"
+
+    @classmethod
+    def _path_or_fragment_re(cls, path_or_fragment: str) -> str:
         """Wildcard expansion + end of line character"""
+        return rf"^{cls._path_or_fragment_re_str(path_or_fragment)}$"
+
+    @staticmethod
+    def _path_or_fragment_re_str(path_or_fragment: str) -> str:
         re_str = _wildcard_re_escape(path_or_fragment)
         if re_str.endswith(r"\|"):
             # case where the match must be exact
-            re_str = re_str[:-2]
-        else:
-            re_str += r".*"
-        re_str = rf"^{re_str}$"
-        return re.compile(re_str, re.IGNORECASE)
+            return re_str[:-2]
+        return re_str + r".*"
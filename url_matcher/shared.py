@@ -0,0 +1,123 @@
+"""
+The shared module contains the SharedURLMatcher class.
+"""
+
+from __future__ import annotations
+
+from functools import partial
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from url_matcher.matcher import _NO_MATCHES, Patterns, URLMatcher
+from url_matcher.storage import Table
+from url_matcher.util import LRUCache
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from url_matcher.matcher import AnyDomainMatcher
+    from url_matcher.storage import StrPath
+
+# typing.Self is not available on Python 3.9
+_SharedURLMatcherT = TypeVar("_SharedURLMatcherT", bound="SharedURLMatcher")
+
+
+class SharedURLMatcher(URLMatcher):
+    def __init__(self, path: StrPath, *, rules_cache_size: int | None = 1024, **kwargs: Any):
+        """
+        A read-only :class:`~.URLMatcher` whose rules are read from a file
+        created with :meth:`.URLMatcher.dump` or :meth:`create`.
+
+        The file is memory mapped, so all the processes of a host using the
+        same file share a single copy of it in memory, e.g. from a file in
+        ``/dev/shm``. The rules of a domain are only unpickled the first time
+        the domain is matched and kept in a cache of limited size.
+
+        Rules can't be added, updated or removed. Otherwise, it has the same
+        matching methods and semantics as :class:`~.URLMatcher`.
+
+        Example usage::
+
+            SharedURLMatcher.create("/dev/shm/rules.bin", {1: Patterns(["example.com"])})
+
+            # In every process
+            matcher = SharedURLMatcher("/dev/shm/rules.bin")
+            assert matcher.match("http://example.com") == 1
+
+        :param path: The path of the file with the rules.
+        :param rules_cache_size: The maximum number of domains whose rules are
+                                 kept unpickled. None means unbounded.
+        :param kwargs: Other keyword arguments of :class:`~.URLMatcher`.
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self._kwargs = {"rules_cache_size": rules_cache_size, **kwargs}
+        self._table = Table.open(path)
+        self._domain_matchers: LRUCache[str, AnyDomainMatcher] = LRUCache(rules_cache_size)
+        universal_idxs = self._table.domain_rules("") or ()
+        self.matchers_universal = [self._table.rule(idx) for idx in universal_idxs]
+        self._patterns_loaded = False
+
+    @classmethod
+    def create(
+        cls, path: StrPath, data: URLMatcher | Mapping[Any, Patterns] | Iterable[tuple[Any, Patterns]], **kwargs: Any
+    ) -> SharedURLMatcher:
+        """
+        Stores the given rules in a file at the given path and returns a matcher reading it.
+
+        :param data: A matcher or the data to build one from.
+        :param kwargs: Keyword arguments for the constructor.
+        """
+        matcher = data if isinstance(data, URLMatcher) else URLMatcher(data)
+        matcher.dump(path)
+        return cls(path, **kwargs)
+
+    def close(self) -> None:
+        """Unmaps the file. The matcher can't be used afterwards."""
+        self._table.close()
+
+    def __enter__(self: _SharedURLMatcherT) -> _SharedURLMatcherT:  # noqa: PYI019
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Other processes attach to the same file instead of copying the rules
+        return partial(type(self), self.path, **self._kwargs), ()
+
+    def add_or_update(self, identifier: Any, patterns: Patterns) -> None:
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    def remove(self, identifier: Any) -> None:
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    def apply_changes(
+        self,
+        upserts: Mapping[Any, Patterns] | Iterable[tuple[Any, Patterns]] = (),
+        deletions: Iterable[Any] = (),
+    ) -> dict[Any, ValueError]:
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    def get(self, identifier: Any) -> Patterns | None:
+        """
+        Returns the patterns of the rule with the given identifier. The first
+        call reads all the rules of the file.
+        """
+        if not self._patterns_loaded:
+            self.patterns = {matcher.identifier: matcher.patterns for matcher in self._table.rules()}
+            self._patterns_loaded = True
+        return super().get(identifier)
+
+    def dump(self, path: StrPath) -> None:
+        raise TypeError(f"{type(self).__name__} can't be dumped, copy the file at {self.path} instead")
+
+    def _domain_matcher(self, domain: str) -> AnyDomainMatcher:
+        domain_matcher = self._domain_matchers.get(domain)
+        if domain_matcher is None:
+            idxs = self._table.domain_rules(domain)
+            if not idxs:
+                domain_matcher = _NO_MATCHES
+            else:
+                domain_matcher = self._build_domain_matcher([self._table.rule(idx) for idx in idxs])
+            self._domain_matchers[domain] = domain_matcher
+        return domain_matcher
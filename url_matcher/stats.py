@@ -0,0 +1,127 @@
+"""
+The stats module contains the MatchStats class.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Sequence
+
+    from url_matcher.matcher import PatternsMatcher
+    from url_matcher.patterns import ParsedURL
+
+
+@dataclass
+class RuleStats:
+    """
+    :param evaluations: The number of URLs the rule was evaluated for.
+    :param hits: The number of URLs the rule matched.
+    :param time: The seconds spent evaluating the rule.
+    """
+
+    evaluations: int = 0
+    hits: int = 0
+    time: float = 0.0
+
+
+@dataclass
+class DomainStats:
+    """
+    :param urls: The number of URLs for which some rules of the domain were candidates.
+    :param hits: The number of those URLs matching a rule of the domain.
+    :param evaluations: The number of rules evaluated.
+    :param time: The seconds spent evaluating the rules.
+    :param scanned_before_hit: The number of rules evaluated before the first hit,
+                               summed over the URLs with a hit.
+    :param max_scanned_before_hit: The maximum number of rules evaluated before
+                                   the first hit of a URL.
+    """
+
+    urls: int = 0
+    hits: int = 0
+    evaluations: int = 0
+    time: float = 0.0
+    scanned_before_hit: int = 0
+    max_scanned_before_hit: int = 0
+
+
+class MatchStats:
+    def __init__(self, callback: Callable[[str, Any, bool, float], None] | None = None):
+        """
+        Records how the rules of a :class:`~.URLMatcher` are evaluated, by
+        domain and by rule identifier, to find the ones that make matching slow.
+
+        Example usage::
+
+            stats = MatchStats()
+            matcher = URLMatcher(rules, stats=stats)
+            ...
+            slowest = sorted(stats.rules.items(), key=lambda item: item[1].time)[-10:]
+
+        The rules of universal patterns are recorded under the empty domain.
+        URLs without candidate rules, e.g. for domains without rules, are not
+        recorded, so that the stats don't grow with every domain seen.
+        Rules are evaluated one by one while recording, so in the ``compiled``
+        mode the candidates found by the regex of the domain are evaluated one
+        by one too, which is slower.
+
+        :param callback: A function called after every rule evaluation with the
+                         domain, the rule identifier, whether the rule matched
+                         and the seconds the evaluation took, e.g. to export
+                         them to a metrics system.
+        """
+        self.callback = callback
+        self.domains: dict[str, DomainStats] = {}
+        self.rules: dict[Any, RuleStats] = {}
+
+    def snapshot(self) -> dict[str, dict[Any, dict[str, Any]]]:
+        """Returns a copy of the stats as plain dicts, by domain and by rule identifier"""
+        return {
+            "domains": {domain: dataclasses.asdict(stats) for domain, stats in self.domains.items()},
+            "rules": {identifier: dataclasses.asdict(stats) for identifier, stats in self.rules.items()},
+        }
+
+    def reset(self) -> None:
+        self.domains.clear()
+        self.rules.clear()
+
+    def iter_matching(
+        self, domain: str, candidates: Sequence[PatternsMatcher], parsed: ParsedURL
+    ) -> Iterator[PatternsMatcher]:
+        """Yields the candidate rules matching the URL, in order, recording their evaluation"""
+        if not candidates:
+            return
+        domain_stats = self.domains.get(domain)
+        if domain_stats is None:
+            domain_stats = self.domains[domain] = DomainStats()
+        domain_stats.urls += 1
+        scanned = 0
+        hit = False
+        for matcher in candidates:
+            start = perf_counter()
+            matched = matcher.match_parsed(parsed)
+            elapsed = perf_counter() - start
+            scanned += 1
+            domain_stats.evaluations += 1
+            domain_stats.time += elapsed
+            rule_stats = self.rules.get(matcher.identifier)
+            if rule_stats is None:
+                rule_stats = self.rules[matcher.identifier] = RuleStats()
+            rule_stats.evaluations += 1
+            rule_stats.time += elapsed
+            if self.callback is not None:
+                self.callback(domain, matcher.identifier, matched, elapsed)
+            if not matched:
+                continue
+            rule_stats.hits += 1
+            if not hit:
+                hit = True
+                domain_stats.hits += 1
+                domain_stats.scanned_before_hit += scanned - 1
+                domain_stats.max_scanned_before_hit = max(domain_stats.max_scanned_before_hit, scanned - 1)
+            yield matcher
@@ -0,0 +1,169 @@
+"""
+Binary tables storing the rules of a :class:`~.URLMatcher` already parsed and
+sorted by domain, so that they can be loaded without building them again.
+
+Only load tables from trusted sources: rules are stored pickled.
+
+All the integers are little endian. The layout of a table is:
+
+* The header: magic bytes, format version, number of rules, number of domains
+  and the offsets of the sections below.
+* The offsets of the rules: one more than the number of rules, so that the
+  rule ``i`` spans from the offset ``i`` to the offset ``i + 1``.
+* The rules, pickled one by one.
+* The domains, sorted by their UTF-8 encoded name: the offset and length of the
+  name and the position and number of the domain rules in the section below.
+* The indexes of the rules of every domain, in matching order.
+* The names of the domains.
+
+Since the domains are sorted and their entries have a fixed size, a domain can
+be found by bisection without reading the whole table, e.g. from a memory
+mapped file shared by several processes.
+"""
+
+from __future__ import annotations
+
+import mmap
+import pickle
+import struct
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Union
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping, Sequence
+    from os import PathLike
+
+    # typing.TypeAlias is not available on Python 3.9
+    StrPath = Union[str, PathLike[str]]
+
+MAGIC = b"URLMTCH\x00"
+VERSION = 3
+
+_HEADER = struct.Struct("<8sIII4Q")
+_OFFSET = struct.Struct("<Q")
+_DOMAIN = struct.Struct("<QIII")
+_RULE_INDEX = struct.Struct("<I")
+
+
+class TableFormatError(ValueError):
+    pass
+
+
+def write_table(path: StrPath, rules: Sequence[Any], domains: Mapping[str, Sequence[int]]) -> None:
+    """
+    Writes a table of rules to the given path.
+
+    :param rules: The rules, pickled into the table.
+    :param domains: The indexes of the rules of every domain, in matching order.
+    """
+    with Path(path).open("wb") as file:
+        _write_table(file, rules, domains)
+
+
+def _write_table(file: IO[bytes], rules: Sequence[Any], domains: Mapping[str, Sequence[int]]) -> None:
+    pickled_rules = [pickle.dumps(rule, protocol=pickle.HIGHEST_PROTOCOL) for rule in rules]
+    names = sorted((domain.encode("utf-8"), domain) for domain in domains)
+
+    rule_offsets_start = _HEADER.size
+    rules_start = rule_offsets_start + _OFFSET.size * (len(rules) + 1)
+    domains_start = rules_start + sum(map(len, pickled_rules))
+    domain_rules_start = domains_start + _DOMAIN.size * len(names)
+    names_start = domain_rules_start + _RULE_INDEX.size * sum(map(len, domains.values()))
+
+    file.write(
+        _HEADER.pack(
+            MAGIC, VERSION, len(rules), len(names), rule_offsets_start, domains_start, domain_rules_start, names_start
+        )
+    )
+    offset = rules_start
+    for pickled_rule in pickled_rules:
+        file.write(_OFFSET.pack(offset))
+        offset += len(pickled_rule)
+    file.write(_OFFSET.pack(offset))
+    for pickled_rule in pickled_rules:
+        file.write(pickled_rule)
+    name_offset = names_start
+    position = 0
+    for encoded, domain in names:
+        count = len(domains[domain])
+        file.write(_DOMAIN.pack(name_offset, len(encoded), position, count))
+        name_offset += len(encoded)
+        position += count
+    for _, domain in names:
+        file.write(struct.pack(f"<{len(domains[domain])}I", *domains[domain]))
+    for encoded, _ in names:
+        file.write(encoded)
+
+
+class Table:
+    def __init__(self, buffer: bytes | mmap.mmap):
+        """
+        Reads the rules of a table lazily from the given buffer.
+        Use :meth:`open` to read them from a memory mapped file.
+        """
+        self.buffer = buffer
+        if len(buffer) < _HEADER.size:
+            raise TableFormatError("The table is truncated")
+        (
+            magic,
+            version,
+            self.rule_count,
+            self.domain_count,
+            self._rule_offsets_start,
+            self._domains_start,
+            self._domain_rules_start,
+            _,
+        ) = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise TableFormatError("The data is not a table of rules")
+        if version != VERSION:
+            raise TableFormatError(f"Unsupported table version {version}, only version {VERSION} is supported")
+
+    @classmethod
+    def open(cls, path: StrPath) -> Table:
+        """Opens the table stored in the file at the given path, memory mapping it"""
+        with Path(path).open("rb") as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self) -> None:
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def rule(self, idx: int) -> Any:
+        start, end = struct.unpack_from("<2Q", self.buffer, self._rule_offsets_start + _OFFSET.size * idx)
+        return pickle.loads(self.buffer[start:end])  # noqa: S301
+
+    def rules(self) -> Iterator[Any]:
+        for idx in range(self.rule_count):
+            yield self.rule(idx)
+
+    def domains(self) -> Iterator[tuple[str, tuple[int, ...]]]:
+        """Yields every domain with the indexes of its rules"""
+        for position in range(self.domain_count):
+            yield self._domain_name(position), self._domain_rules(position)
+
+    def domain_rules(self, domain: str) -> tuple[int, ...] | None:
+        """Returns the indexes of the rules of the domain or None if it isn't in the table"""
+        encoded = domain.encode("utf-8")
+        low, high = 0, self.domain_count
+        while low < high:
+            middle = (low + high) // 2
+            name_offset, name_length, _, _ = _DOMAIN.unpack_from(
+                self.buffer, self._domains_start + _DOMAIN.size * middle
+            )
+            name = self.buffer[name_offset : name_offset + name_length]
+            if name < encoded:
+                low = middle + 1
+            elif name > encoded:
+                high = middle
+            else:
+                return self._domain_rules(middle)
+        return None
+
+    def _domain_name(self, position: int) -> str:
+        name_offset, name_length, _, _ = _DOMAIN.unpack_from(self.buffer, self._domains_start + _DOMAIN.size * position)
+        return self.buffer[name_offset : name_offset + name_length].decode("utf-8")
+
+    def _domain_rules(self, position: int) -> tuple[int, ...]:
+        _, _, first, count = _DOMAIN.unpack_from(self.buffer, self._domains_start + _DOMAIN.size * position)
+        return struct.unpack_from(f"<{count}I", self.buffer, self._domain_rules_start + _RULE_INDEX.size * first)